@@ -1,210 +1,491 @@
 import numpy as np
-import copy
+
+# Alokacja rzadka (CSR): zadanie i używa zasobów
+# indices[indptr[i]:indptr[i+1]]. Liczba podzadań zadania nie zmienia się
+# w trakcie kroku 2, więc indptr jest stały, a ruch j -> p to podmiana
+# jednego indeksu. Indeksy trzymamy w najmniejszym wystarczającym typie
+# całkowitym - przy 100k zadań x 10k zasobów gęsta macierz int64 to 8 GB.
+class SparseAllocation:
+    def __init__(self, indptr, indices, num_resources):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.min_scalar_type(max(num_resources - 1, 0)))
+        self.num_resources = num_resources
+
+    @classmethod
+    def from_dense(cls, allocation_matrix):
+        alloc = np.asarray(allocation_matrix).astype(int)
+        counts = np.maximum(alloc, 0)
+        rows, cols = np.nonzero(counts)
+        # a_ij > 1 -> indeks zasobu powtórzony a_ij razy
+        reps = counts[rows, cols]
+        indptr = np.concatenate(([0], np.cumsum(np.sum(counts, axis=1))))
+        return cls(indptr, np.repeat(cols, reps), alloc.shape[1])
+
+    @property
+    def num_tasks(self):
+        return len(self.indptr) - 1
+
+    @property
+    def shape(self):
+        return (self.num_tasks, self.num_resources)
+
+    def row(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def row_counts(self):
+        return np.diff(self.indptr)
+
+    def task_index(self):
+        # numer zadania dla każdego wpisu w indices
+        return np.repeat(np.arange(self.num_tasks), self.row_counts())
+
+    def gather_rows(self, tasks):
+        # wpisy CSR wybranych zadań: (zadanie, zasób, początki segmentów)
+        starts = self.indptr[tasks]
+        lens = self.indptr[np.asarray(tasks) + 1] - starts
+        seg = np.concatenate(([0], np.cumsum(lens)[:-1]))
+        offsets = np.repeat(starts - seg, lens) + np.arange(int(np.sum(lens)))
+        return np.repeat(tasks, lens), self.indices[offsets], seg
+
+    def load_vector(self):
+        return np.bincount(self.indices, minlength=self.num_resources)
+
+    def move(self, i, j, p):
+        row = self.row(i)
+        row[np.flatnonzero(row == j)[0]] = p
+
+    def copy(self):
+        return SparseAllocation(self.indptr.copy(), self.indices.copy(), self.num_resources)
+
+    def to_dense(self, dtype=int):
+        dense = np.zeros(self.shape, dtype=dtype)
+        np.add.at(dense, (self.task_index(), self.indices.astype(np.int64)), 1)
+        return dense
 
 class WeiCloudProject:
-    def __init__(self, prices, exec_times, subtasks_count, wt=0.5, we=0.5):
-        # dane wejściowe z modelu
-        self.PRICES = np.array(prices)
-        self.EXEC_TIMES = np.array(exec_times)
-        self.SUBTASKS_COUNT = subtasks_count
+    def __init__(self, prices, exec_times, subtasks_count, wt=0.5, we=0.5, verbose=True):
+        # dane wejściowe z modelu; verbose=False wyłącza wydruki kroków 1 i 2
+        # (przy dużych instancjach stdout kosztuje więcej niż same obliczenia)
+        self.PRICES = np.array(prices, dtype=float)
+        self.EXEC_TIMES = np.array(exec_times, dtype=float)
+        self.SUBTASKS_COUNT = np.array(subtasks_count, dtype=int)
         self.WT = wt
         self.WE = we                             
         
         self.num_tasks = len(subtasks_count)
         self.num_resources = len(prices)
+        self.verbose = verbose
 
-    def calculate_utility(self, task_idx, strategy_vector, load_vector):
-        # oblicza utility wg wzoru (5) z artykułu
-        # sprawdzenie czy strategia jest poprawna
-        if int(np.sum(strategy_vector)) != self.SUBTASKS_COUNT[task_idx]:
-            return 0.0
-
-        times = []
-        expenses = []
-
-        for r in range(self.num_resources):
-            aij = int(strategy_vector[r])
-            if aij <= 0:
-                continue
+    @classmethod
+    def random_instance(cls, tasks, resources, rng, verbose=False):
+        # losowa instancja: szybsze zasoby są droższe i średnio szybsze, ale czas
+        # każdej pary (zadanie, zasób) losowany niezależnie - zadania różnią się
+        # rankingiem zasobów (macierz rzędu 1 dawała wszystkim ten sam ranking)
+        speed = np.sort(rng.uniform(1.0, 3.0, resources))
+        prices = speed * rng.uniform(0.8, 1.2, resources)
+        exec_times = rng.uniform(2.0, 8.0, (tasks, resources)) / speed
+        subtasks = rng.integers(1, 6, tasks)
+        return cls(prices, exec_times, subtasks, verbose=verbose)
 
-            base_time = float(self.EXEC_TIMES[task_idx][r])
-
-            # czas rośnie z obciążeniem (multiplexing)
-            current_load = int(load_vector[r])
-            if current_load < 1: 
-                current_load = 1
+    def calculate_utility(self, task_idx, strategy_vector, load_vector):
+        # oblicza utility wg wzoru (5) z artykułu - jedno zadanie,
+        # cienka nakładka na wektorowy kernel
+        strategy = np.asarray(strategy_vector)[None, :]
+        utilities = self._utility_kernel(strategy, load_vector, self.EXEC_TIMES[task_idx][None, :],
+                                         self.SUBTASKS_COUNT[task_idx:task_idx + 1])
+        return float(utilities[0])
 
-            actual_time = base_time * current_load 
-            times.append(actual_time)
+    def calculate_utilities(self, allocation_matrix, load_vector):
+        # utility wszystkich zadań naraz (wiersz = zadanie)
+        if isinstance(allocation_matrix, SparseAllocation):
+            turnaround, expense, valid = self._sparse_cost_components(allocation_matrix, load_vector)
+            return self._utilities_from_costs(turnaround, expense, valid)
+        return self._utility_kernel(allocation_matrix, load_vector, self.EXEC_TIMES, self.SUBTASKS_COUNT)
 
-            # koszt niezależny od kolejki
-            expense_per_subtask = base_time * float(self.PRICES[r])
-            expenses.append(expense_per_subtask * aij)
+    def _sparse_cost_components(self, allocation, load_vector):
+        # to samo co _cost_components, ale tylko po niezerowych wpisach CSR
+        rows = allocation.task_index()
+        cols = allocation.indices
+        t = self.EXEC_TIMES[rows, cols]
+        load = np.maximum(np.asarray(load_vector).astype(int), 1)
+        turnaround = np.zeros(allocation.num_tasks)
+        np.maximum.at(turnaround, rows, t * load[cols])
+        expense = np.bincount(rows, weights=t * self.PRICES[cols], minlength=allocation.num_tasks)
+        counts = allocation.row_counts()
+        valid = (counts == self.SUBTASKS_COUNT) & (counts > 0)
+        return turnaround, expense, valid
 
-        if not times:
-            return 0.0
+    def _cost_components(self, allocation_matrix, load_vector, exec_times, subtasks_count):
+        raw = np.asarray(allocation_matrix)
+        # jak int(a_ij) w wersji pętlowej; liczba podzadań to int(sum(a_i)) z surowych wartości
+        alloc = np.trunc(raw) if raw.dtype.kind == 'f' else raw
+        # tylko niezerowe wpisy: flatnonzero na płaskiej masce jest kilka razy
+        # szybsze niż 2-D nonzero, a dalsze obliczenia idą po kilku wpisach na
+        # wiersz zamiast po całej macierzy (T x R) - bez buforów roboczych
+        T, R = alloc.shape
+        flat = alloc.ravel()
+        idx = np.flatnonzero(flat > 0)
+        rows, cols = np.divmod(idx, R)
+        t = np.broadcast_to(exec_times, alloc.shape)[rows, cols]
+        # koszt niezależny od kolejki: sum_r a_ir * t_ir * p_r
+        expense = np.bincount(rows, weights=flat[idx] * t * self.PRICES[cols], minlength=T)
+        # czas rośnie z obciążeniem (multiplexing); najdłuższy czas (równoległe
+        # wykonanie) - maksimum w segmencie wiersza (idx rosnące -> wiersze ciągłe)
+        load = np.maximum(np.asarray(load_vector).astype(int), 1)
+        turnaround = np.zeros(T)
+        used = np.zeros(T, dtype=bool)
+        if len(idx):
+            starts = np.flatnonzero(np.diff(rows, prepend=-1))
+            turnaround[rows[starts]] = np.maximum.reduceat(t * load[cols], starts)
+            used[rows[starts]] = True
+        # strategia musi mieć dokładnie k(i) podzadań i choć jeden zasób
+        valid = (np.trunc(np.sum(raw, axis=1)) == np.asarray(subtasks_count)) & used
+        return turnaround, expense, valid
 
-        # najdłuższy czas (równoległe wykonanie)
-        t_turnaround = max(times)
-        total_expense = sum(expenses)
+    def _utility_kernel(self, allocation_matrix, load_vector, exec_times, subtasks_count):
+        turnaround, expense, valid = self._cost_components(allocation_matrix, load_vector,
+                                                           exec_times, subtasks_count)
+        return self._utilities_from_costs(turnaround, expense, valid)
 
-        cost_value = (self.WT * t_turnaround) + (self.WE * total_expense)
-        
-        if cost_value <= 0: 
-            return 0.0
-        return 1.0 / cost_value
+    def _utilities_from_costs(self, turnaround, expense, valid):
+        cost_value = (self.WT * turnaround) + (self.WE * expense)
+        ok = valid & (cost_value > 0)
+        return np.where(ok, 1.0 / np.where(ok, cost_value, 1.0), 0.0)
 
     def get_load_vector(self, allocation_matrix):
         # ile zadań na każdym zasobie
+        if isinstance(allocation_matrix, SparseAllocation):
+            return allocation_matrix.load_vector()
         return np.sum(allocation_matrix, axis=0)
     
     def get_total_system_utility(self, allocation_matrix):
         # suma utility wszystkich zadań (do GELR)
         load_vector = self.get_load_vector(allocation_matrix)
-        total_u = 0.0
-        for i in range(self.num_tasks):
-            total_u += self.calculate_utility(i, allocation_matrix[i], load_vector)
-        return total_u
+        return float(np.sum(self.calculate_utilities(allocation_matrix, load_vector)))
 
-    def step1_independent_optimization(self):
+    def step1_independent_optimization(self, sparse=False, block_size=None):
         # każde zadanie wybiera zasoby bez uwzględniania innych
+        allocation = self._cheapest_resources(block_size)
+        if not self.verbose: return allocation if sparse else allocation.to_dense()
+
         print(f"\n{'='*60}")
         print("KROK 1: Optymalizacja niezależna")
         print(f"{'='*60}")
         
-        allocation_matrix = np.zeros((self.num_tasks, self.num_resources), dtype=int)
         dummy_load = np.ones(self.num_resources) 
-
+        u_init = self.calculate_utilities(allocation, dummy_load)
         for i in range(self.num_tasks):
-            # greedy - bierzemy k(i) najtańszych zasobów
-            resource_costs = []
-            for r in range(self.num_resources):
-                t = self.EXEC_TIMES[i][r]
-                p = self.PRICES[r]
-                cost = (self.WT * t) + (self.WE * (t * p))
-                resource_costs.append((cost, r))
-            
-            resource_costs.sort(key=lambda x: x[0])
-            k = self.SUBTASKS_COUNT[i]
-            chosen_resources = [r for (_, r) in resource_costs[:k]]
+            row = np.zeros(self.num_resources, dtype=int)
+            np.add.at(row, allocation.row(i).astype(np.int64), 1)
+            print(f"S{i+1}: {row} (utility: {u_init[i]:.4f})")
             
-            for r in chosen_resources:
-                allocation_matrix[i][r] = 1
-            
-            u_init = self.calculate_utility(i, allocation_matrix[i], dummy_load)
-            print(f"S{i+1}: {allocation_matrix[i]} (utility: {u_init:.4f})")
-            
-        return allocation_matrix
+        return allocation if sparse else allocation.to_dense()
 
-    def step2_evolutionary_optimization(self, initial_matrix):
-        # iteracyjne rozwiązywanie konfliktów
-        print(f"\n{'='*60}")
-        print("KROK 2: Optymalizacja ewolucyjna")
-        print(f"{'='*60}")
+    def _cheapest_resources(self, block_size=None):
+        # greedy - bierzemy k(i) najtańszych zasobów. Macierz kosztów liczymy
+        # jednym wyrażeniem, ale blokami wierszy (pełna T x R może się nie
+        # zmieścić w pamięci), a k(i) najtańszych wybieramy np.argpartition.
+        T, R = self.num_tasks, self.num_resources
+        if block_size is None: block_size = max(1, (1 << 22) // max(R, 1))
+        k_all = np.minimum(self.SUBTASKS_COUNT, R)
+        cols_out = []
+        for start in range(0, T, block_size):
+            stop = min(start + block_size, T)
+            t = self.EXEC_TIMES[start:stop]
+            cost = (self.WT * t) + (self.WE * (t * self.PRICES))
+            k = k_all[start:stop]
+            # k-ty najmniejszy koszt w każdym wierszu (grupujemy po k)
+            kth = np.full(stop - start, -np.inf)
+            for kk in np.unique(k[k > 0]):
+                sel = np.flatnonzero(k == kk)
+                part = np.argpartition(cost[sel], kk - 1, axis=1)[:, kk - 1]
+                kth[sel] = cost[sel, part]
+            # wszystko tańsze od k-tego + remisy w kolejności indeksów
+            # (tak jak stabilne sortowanie po koszcie)
+            chosen = cost < kth[:, None]
+            ties = cost == kth[:, None]
+            need = k - np.sum(chosen, axis=1)
+            chosen |= ties & (np.cumsum(ties, axis=1) <= need[:, None])
+            cols_out.append(np.nonzero(chosen)[1])
+        cols = np.concatenate(cols_out) if cols_out else np.zeros(0, dtype=int)
+        indptr = np.concatenate(([0], np.cumsum(k_all)))
+        return SparseAllocation(indptr, cols, R)
+
+    def step2_evolutionary_optimization(self, initial_matrix, max_iterations=20):
+        # iteracyjne rozwiązywanie konfliktów; max_iterations=None -> aż do
+        # równowagi. Przebieg (iteracje, realokacje, zbieżność) trafia do
+        # self.step2_stats.
+        verbose = self.verbose
+        if verbose:
+            print(f"\n{'='*60}")
+            print("KROK 2: Optymalizacja ewolucyjna")
+            print(f"{'='*60}")
+
+        # praca zawsze na reprezentacji rzadkiej; wynik w typie wejścia
+        sparse_input = isinstance(initial_matrix, SparseAllocation)
+        if sparse_input: current_alloc = initial_matrix.copy()
+        else: current_alloc = SparseAllocation.from_dense(initial_matrix)
+        state = IncrementalUtilityState(self, current_alloc)
+
+        # zasoby z wieloma zadaniami w kopcu wg maksymalnego czasu wykonania
+        # (remisy: niższy numer zasobu pierwszy)
+        conflicts = IndexedMaxHeap()
+        for r in np.flatnonzero(state.load > 1).tolist():
+            conflicts.set(r, state.conflict_key(r))
 
-        current_alloc = copy.deepcopy(initial_matrix)
-        flag = True 
         iteration = 0
-        MAX_ITERATIONS = 20
+        reallocations = 0
+        converged = False
 
-        while flag and iteration < MAX_ITERATIONS:
-            flag = False
+        while max_iterations is None or iteration < max_iterations:
             iteration += 1
-            print(f"\n--- Iteracja {iteration} ---")
-            
-            load_vector = self.get_load_vector(current_alloc)
+            if verbose: print(f"\n--- Iteracja {iteration} ---")
             
-            # szukamy zasobów z wieloma zadaniami
-            candidates_res = [r for r, l in enumerate(load_vector) if l > 1]
-            if not candidates_res:
-                print("Brak konfliktów. Koniec.")
+            if not conflicts:
+                if verbose: print("Brak konfliktów. Koniec.")
+                converged = True
                 break
 
-            # sortowanie wg czasu (najpierw te najbardziej obciążone)
-            candidates_with_time = []
-            for r in candidates_res:
-                max_t = 0
-                for task_idx in range(self.num_tasks):
-                    if current_alloc[task_idx][r] == 1:
-                        max_t = max(max_t, self.EXEC_TIMES[task_idx][r])
-                candidates_with_time.append((max_t, r))
-            
-            candidates_with_time.sort(key=lambda x: x[0], reverse=True)
-            multiplexed_resources = [r for (_, r) in candidates_with_time]
-            print(f"Przeciążone zasoby: {multiplexed_resources}")
-
-            for j in multiplexed_resources:
-                users_of_j = [i for i in range(self.num_tasks) if current_alloc[i][j] > 0]
-                candidates_to_move = []
-
-                # sprawdzamy SPELR dla każdego zadania używającego tego zasobu
-                for task_idx in users_of_j:
-                    u_current = self.calculate_utility(task_idx, current_alloc[task_idx], load_vector)
-                    
-                    best_spelr = 0.0 # Szukamy wartości ujemnych (zysk)
-                    best_target = -1
-
-                    for p in range(self.num_resources):
-                        if p == j: continue
-                        if current_alloc[task_idx][p] == 1: continue
-                        
-                        # testujemy ruch
-                        temp_alloc = current_alloc.copy()
-                        temp_alloc[task_idx][j] = 0
-                        temp_alloc[task_idx][p] = 1
-                        
-                        temp_load = self.get_load_vector(temp_alloc)
-                        u_new = self.calculate_utility(task_idx, temp_alloc[task_idx], temp_load)
-                        
-                        spelr = u_current - u_new
-                        
-                        if spelr < best_spelr:
-                            best_spelr = spelr
-                            best_target = p
-                    
-                    if best_target != -1:
-                        candidates_to_move.append((task_idx, best_target, best_spelr))
-
-                if not candidates_to_move:
-                    continue
-                
-                # liczymy GELR - wybieramy ruch najbardziej opłacalny globalnie
-                total_utility_before = self.get_total_system_utility(current_alloc)
-                
-                best_candidate_tuple = None
-                min_gelr = float('inf')
-
-                for (t_idx, tgt, sp) in candidates_to_move:
-                    temp_alloc = current_alloc.copy()
-                    temp_alloc[t_idx][j] = 0
-                    temp_alloc[t_idx][tgt] = 1
-                    
-                    total_utility_after = self.get_total_system_utility(temp_alloc)
-                    gelr = total_utility_before - total_utility_after
-                    
-                    if gelr < min_gelr:
-                        min_gelr = gelr
-                        best_candidate_tuple = (t_idx, tgt, sp, gelr)
-                
-                if best_candidate_tuple:
-                    final_task, final_target, final_spelr, final_gelr = best_candidate_tuple
-                    
-                    print(f"  Realokacja: S{final_task+1} R{j+1}->R{final_target+1}")
-                    print(f"  SPELR={final_spelr:.5f}, GELR={final_gelr:.5f}")
-                    
-                    current_alloc[final_task][j] = 0
-                    current_alloc[final_task][final_target] = 1
-                    
-                    flag = True
-                    break
-            
-            if not flag:
-                print("Równowaga osiągnięta.")
+            if verbose: print(f"Przeciążone zasoby: {conflicts.sorted_items()}")
+
+            # zdejmujemy zasoby od najbardziej obciążonego, aż któryś da ruch
+            skipped = []
+            move = None
+            while conflicts:
+                j, key = conflicts.pop()
+                move = self._best_move_on(state, j)
+                if move is not None: break
+                skipped.append((j, key))
+
+            for r, key in skipped:
+                conflicts.set(r, key)
+
+            if move is None:
+                if verbose: print("Równowaga osiągnięta.")
+                converged = True
+                break
+
+            final_task, final_target, final_spelr, final_gelr = move
+            if verbose:
+                print(f"  Realokacja: S{final_task+1} R{j+1}->R{final_target+1}")
+                print(f"  SPELR={final_spelr:.5f}, GELR={final_gelr:.5f}")
+
+            state.apply_move(final_task, j, final_target)
+            reallocations += 1
+            # zmieniły się tylko zasoby j i p
+            for r in (j, final_target):
+                if state.load[r] > 1: conflicts.set(r, state.conflict_key(r))
+                else: conflicts.discard(r)
         
-        if iteration >= MAX_ITERATIONS:
+        if not converged and verbose:
             print("Uwaga: przekroczono limit iteracji")
 
-        return current_alloc
+        self.step2_stats = {'iterations': iteration, 'reallocations': reallocations,
+                            'converged': converged}
+        return current_alloc if sparse_input else current_alloc.to_dense()
+
+    def _best_move_on(self, state, j):
+        candidates_to_move = []
+
+        # sprawdzamy SPELR dla każdego zadania używającego tego zasobu
+        for task_idx in sorted(state.users[j]):
+            best_target, best_spelr = state.best_spelr_move(task_idx, j)
+            if best_target != -1:
+                candidates_to_move.append((task_idx, best_target, best_spelr))
+
+        # liczymy GELR - wybieramy ruch najbardziej opłacalny globalnie
+        best_candidate_tuple = None
+        min_gelr = float('inf')
+
+        for (t_idx, tgt, sp) in candidates_to_move:
+            gelr = state.gelr(t_idx, j, tgt)
+            
+            if gelr < min_gelr:
+                min_gelr = gelr
+                best_candidate_tuple = (t_idx, tgt, sp, gelr)
+        return best_candidate_tuple
+
+# Indeksowany kopiec max: element -> klucz, z pozycjami elementów w tablicy,
+# więc zmiana klucza i usunięcie dowolnego elementu kosztują O(log n).
+class IndexedMaxHeap:
+    def __init__(self):
+        self.items = []
+        self.keys = {}
+        self.pos = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return item in self.pos
+
+    def _less(self, a, b):
+        # porządek kopca: większy klucz, przy remisie mniejszy element
+        ka, kb = self.keys[self.items[a]], self.keys[self.items[b]]
+        return ka < kb or (ka == kb and self.items[a] > self.items[b])
+
+    def _swap(self, a, b):
+        self.items[a], self.items[b] = self.items[b], self.items[a]
+        self.pos[self.items[a]] = a
+        self.pos[self.items[b]] = b
+
+    def _up(self, i):
+        while i > 0:
+            parent = (i - 1) // 2
+            if not self._less(parent, i): break
+            self._swap(parent, i)
+            i = parent
+
+    def _down(self, i):
+        n = len(self.items)
+        while True:
+            best = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < n and self._less(best, child): best = child
+            if best == i: break
+            self._swap(i, best)
+            i = best
+
+    def set(self, item, key):
+        if item in self.pos:
+            self.keys[item] = key
+            self._up(self.pos[item])
+            self._down(self.pos[item])
+            return
+        self.keys[item] = key
+        self.items.append(item)
+        self.pos[item] = len(self.items) - 1
+        self._up(len(self.items) - 1)
+
+    def discard(self, item):
+        if item not in self.pos: return
+        i = self.pos[item]
+        self._swap(i, len(self.items) - 1)
+        self.items.pop()
+        del self.pos[item]
+        del self.keys[item]
+        if i < len(self.items):
+            self._up(i)
+            self._down(i)
+
+    def pop(self):
+        item = self.items[0]
+        key = self.keys[item]
+        self.discard(item)
+        return item, key
+
+    def sorted_items(self):
+        return sorted(self.items, key=lambda r: (-self.keys[r], r))
+
+# Stan przyrostowy dla kroku 2: obciążenie zasobów, zbiory zadań na zasobach
+# oraz czas (turnaround), koszt i utility każdego zadania. Ruch podzadania
+# j -> p zmienia obciążenie tylko na j i p, więc SPELR i GELR liczymy,
+# dotykając wyłącznie zadań korzystających z j lub p - bez kopii macierzy.
+# Alokacja trzymana jest jako SparseAllocation i modyfikowana w miejscu.
+class IncrementalUtilityState:
+    def __init__(self, project, allocation):
+        self.project = project
+        self.E = project.EXEC_TIMES
+        self.P = project.PRICES
+        self.alloc = allocation
+
+        self.load = allocation.load_vector().astype(int)
+        self.users = [set() for _ in range(allocation.num_resources)]
+        for i, r in zip(allocation.task_index().tolist(), allocation.indices.tolist()):
+            self.users[r].add(i)
+
+        # strategia niepoprawna (zła liczba podzadań) -> utility 0, ruchy tego nie zmieniają
+        self.turnaround, self.expense, self.valid = project._sparse_cost_components(allocation, self.load)
+        self.utility = project._utilities_from_costs(self.turnaround, self.expense, self.valid)
+        self.total = float(np.sum(self.utility))
+
+    def conflict_key(self, r):
+        # najdłuższy bazowy czas wykonania wśród zadań na zasobie r
+        return float(np.max(self.E[list(self.users[r]), r]))
+
+    def _turnaround(self, i, idx):
+        if len(idx) == 0: return 0.0
+        return float(np.max(self.E[i, idx] * np.maximum(self.load[idx], 1)))
+
+    def _utility(self, i, turnaround, expense):
+        if not self.valid[i]: return 0.0
+        cost = self.project.WT * turnaround + self.project.WE * expense
+        return 1.0 / cost if cost > 0 else 0.0
+
+    def best_spelr_move(self, i, j):
+        # najlepszy (najbardziej ujemny) SPELR dla przeniesienia z j na dowolne p
+        if not self.valid[i]: return -1, 0.0
+        row = self.alloc.row(i)
+        base = self._turnaround(i, row[row != j])
+        E_i = self.E[i]
+        # na p obciążenie rośnie o 1, pozostałe zasoby zadania bez zmian
+        turn = np.maximum(base, E_i * np.maximum(self.load + 1, 1))
+        exp = self.expense[i] - E_i[j] * self.P[j] + E_i * self.P
+        cost = self.project.WT * turn + self.project.WE * exp
+        with np.errstate(divide='ignore'):
+            u_new = np.where(cost > 0, 1.0 / cost, 0.0)
+        spelr = self.utility[i] - u_new
+        spelr[row] = 0.0
+        p = int(np.argmin(spelr))
+        if spelr[p] < 0.0: return p, float(spelr[p])
+        return -1, 0.0
+
+    def _with_move(self, i, j, p, fn):
+        # chwilowo wykonuje ruch na stanie, liczy fn() i cofa ruch
+        self.load[j] -= 1; self.load[p] += 1
+        self.alloc.move(i, j, p)
+        try: return fn()
+        finally:
+            self.alloc.move(i, p, j)
+            self.load[j] += 1; self.load[p] -= 1
+
+    def _evaluate_move(self, i, j, p):
+        # nowe czasy i utility zadań dotkniętych ruchem i: j -> p.
+        # Na p czas rośnie, więc wystarczy max ze starym turnaround; na j
+        # maleje, więc pełne przeliczenie tylko tam, gdzie j wyznaczał maksimum.
+        users_j = self.users[j] - {i}
+        K_j = np.fromiter(users_j, dtype=np.int64, count=len(users_j))
+        K_p = np.fromiter(self.users[p], dtype=np.int64, count=len(self.users[p]))
+        K = np.union1d(K_j, K_p)
+        turn = self.turnaround[K]
+        at_p = np.searchsorted(K, K_p)
+        turn[at_p] = np.maximum(turn[at_p], self.E[K_p, p] * max(self.load[p] + 1, 1))
+        top = K_j[self.E[K_j, j] * max(self.load[j], 1) >= self.turnaround[K_j]]
+
+        def recompute():
+            top_turn = None
+            if len(top):
+                rows, cols, seg = self.alloc.gather_rows(top)
+                times = self.E[rows, cols] * np.maximum(self.load[cols], 1)
+                top_turn = np.maximum.reduceat(times, seg)
+            return top_turn, self._turnaround(i, self.alloc.row(i))
+        top_turn, turn_i = self._with_move(i, j, p, recompute)
+        if len(top): turn[np.searchsorted(K, top)] = top_turn
+
+        exp_i = self.expense[i] - self.E[i, j] * self.P[j] + self.E[i, p] * self.P[p]
+        util_K = self.project._utilities_from_costs(turn, self.expense[K], self.valid[K])
+        util_i = self._utility(i, turn_i, exp_i)
+        return K, turn, util_K, turn_i, exp_i, util_i
+
+    def gelr(self, i, j, p):
+        # GELR = U_przed - U_po, liczone tylko na zadaniach dotkniętych ruchem
+        K, _, util_K, _, _, util_i = self._evaluate_move(i, j, p)
+        return (float(np.sum(self.utility[K])) + self.utility[i]) - (float(np.sum(util_K)) + util_i)
+
+    def apply_move(self, i, j, p):
+        K, turn, util_K, turn_i, exp_i, util_i = self._evaluate_move(i, j, p)
+        self.total -= (float(np.sum(self.utility[K])) + self.utility[i]) - (float(np.sum(util_K)) + util_i)
+        self.turnaround[K] = turn
+        self.utility[K] = util_K
+        self.turnaround[i], self.expense[i], self.utility[i] = turn_i, exp_i, util_i
+        self.load[j] -= 1; self.load[p] += 1
+        self.alloc.move(i, j, p)
+        self.users[j].discard(i); self.users[p].add(i)
+
+# rozmiar instancji z wiersza poleceń: "ZADANIAxZASOBY" (benchmark.py, eksperyment_wei.py)
+def parse_shape(text):
+    tasks, resources = text.lower().split('x')
+    return int(tasks), int(resources)
 
 if __name__ == "__main__":
     prices = [1.0, 1.2, 1.5, 1.8, 2.0]
@@ -1,73 +1,281 @@
-import cvxpy as cp
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from tqdm import tqdm
-from scipy.optimize import minimize
 import argparse
 import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from slady import TraceSource, convert_csv_trace, open_trace, trace_spec
+from telemetria import Telemetry
+from wyniki import ResultCache, ResultsStore, StreamingStats
+
+# Symulator i CLI; infrastruktura przebiegu w osobnych modułach: telemetria.py
+# (Telemetry), wyniki.py (ResultsStore, StreamingStats, ResultCache), slady.py
+# (ślady obciążenia). cvxpy, scipy, matplotlib i tqdm importowane są dopiero
+# przy pierwszym użyciu: proces roboczy liczący natywnym water-fillingiem
+# i przebieg z --no-plot nie płacą sekund importu bibliotek, których nie dotykają.
+
+# --- SILNIK NBS (water-filling) ---
+# max sum(w_i * log(x_i - m_i))  przy  sum(x) <= C,  m_i <= x_i <= u_i
+# Z warunków KKT: x_i(lam) = min(m_i + w_i / lam, u_i), gdzie lam to zmienna
+# dualna ograniczenia pojemności. sum(x(lam)) maleje z lam, więc lam szukamy
+# bisekcją. Bez limitów u_i rozwiązanie jest jawne (równy podział nadwyżki).
+def water_filling_nbs(min_reqs, capacity, weights=None, max_caps=None, iters=100):
+    m = np.asarray(min_reqs, dtype=float)
+    if len(m) == 0: return m.copy()
+    w = None if weights is None else np.asarray(weights, dtype=float)[None, :]
+    u = None if max_caps is None else np.asarray(max_caps, dtype=float)[None, :]
+    x = water_filling_nbs_batch(m[None, :], capacity, w, u, iters)[0]
+    if np.isnan(x[0]): return None
+    return x
+
+# Wersja wierszowa: każdy wiersz (iterations x n) to osobna instancja
+# z własną pojemnością. Wiersze niewykonalne wypełniane są NaN.
+def water_filling_nbs_batch(min_reqs, capacities, weights=None, max_caps=None, iters=100):
+    m = np.atleast_2d(np.asarray(min_reqs, dtype=float))
+    rows = m.shape[0]
+    cap = np.broadcast_to(np.asarray(capacities, dtype=float), (rows,))
+    surplus_cap = cap - np.sum(m, axis=1)
+    infeasible = surplus_cap < 0
+    w = np.ones_like(m) if weights is None else np.broadcast_to(weights, m.shape)
+    if weights is not None and np.any(w < 0): raise ValueError("Wagi NBS muszą być nieujemne")
+    w_sum = np.sum(w, axis=1)
+
+    # Przypadek jawny: nadwyżka dzielona proporcjonalnie do wag. Waga 0 -> użytkownik
+    # zostaje na swoim minimum (wiersz z samymi zerami: wszyscy na minimum)
+    x = m + w * (surplus_cap / np.where(w_sum > 0, w_sum, 1.0))[:, None]
+    if max_caps is not None:
+        u = np.broadcast_to(np.asarray(max_caps, dtype=float), m.shape)
+        infeasible |= np.any(u < m, axis=1)
+        capped = np.any(x > u, axis=1) & ~infeasible
+        # Wszyscy (z wagą > 0) dostają swój limit i pojemność i tak zostaje
+        top = np.where(w > 0, u, m)
+        all_capped = capped & (np.sum(top, axis=1) <= cap)
+        x[all_capped] = top[all_capped]
+        todo = capped & ~all_capped
+        if np.any(todo):
+            x[todo] = _bisect_capped(m[todo], cap[todo], w[todo], u[todo],
+                                     w_sum[todo], surplus_cap[todo], iters)
+    x[infeasible] = np.nan
+    return x
+
+def _bisect_capped(m, cap, w, u, w_sum, surplus_cap, iters):
+    # Bisekcja po log(lam), osobno dla każdego wiersza:
+    # lam_hi = sum(w)/S -> suma <= C (limity tylko obcinają),
+    # lam_lo = min(w/(u-m)) -> wszyscy na limicie, suma = sum(u) > C
+    # Użytkownicy z wagą 0 stoją na m_i dla każdego lam, więc nie wyznaczają
+    # granicy (inaczej log(0) = -inf i bisekcja daje NaN)
+    span = u - m
+    pos = (span > 0) & (w > 0)
+    lo = np.log(np.min(np.where(pos, w / np.where(pos, span, 1.0), np.inf), axis=1))
+    hi = np.log(w_sum / surplus_cap)
+    for _ in range(iters):
+        mid = 0.5 * (lo + hi)
+        over = np.sum(np.minimum(m + w * np.exp(-mid)[:, None], u), axis=1) > cap
+        lo = np.where(over, mid, lo)
+        hi = np.where(over, hi, mid)
+    return np.minimum(m + w * np.exp(-hi)[:, None], u)
+
+# --- CACHE PROBLEMÓW CVXPY ---
+# Problem NBS o danym n kompilujemy raz (DPP: min_reqs, wagi, pojemność
+# i limity to cp.Parameter), a potem tylko podmieniamy wartości parametrów.
+# Kanonikalizacja przestaje być płacona przy każdym wywołaniu.
+class CompiledNBSProblem:
+    SOLVERS = ('ECOS', 'SCS')
+
+    def __init__(self, n, capped=False):
+        import cvxpy as cp
+        self.x = cp.Variable(n)
+        self.min_reqs = cp.Parameter(n)
+        self.weights = cp.Parameter(n, nonneg=True)
+        self.capacity = cp.Parameter(nonneg=True)
+        self.max_caps = cp.Parameter(n) if capped else None
+        # Nadwyżka jako osobna zmienna - log(surplus) nie zawiera parametrów,
+        # więc iloczyn z wagami spełnia reguły DPP
+        surplus = cp.Variable(n)
+        objective = cp.Maximize(cp.sum(cp.multiply(self.weights, cp.log(surplus))))
+        constraints = [surplus == self.x - self.min_reqs,
+                       cp.sum(self.x) <= self.capacity, surplus >= 1e-7]
+        if capped: constraints.append(self.x <= self.max_caps)
+        self.prob = cp.Problem(objective, constraints)
+        self.solver = None  # ostatni skuteczny solver - próbowany jako pierwszy
+
+    def solve(self, min_reqs, capacity, weights, max_caps=None, telemetry=None):
+        self.min_reqs.value = np.asarray(min_reqs, dtype=float)
+        self.weights.value = np.asarray(weights, dtype=float)
+        self.capacity.value = float(capacity)
+        if self.max_caps is not None: self.max_caps.value = np.asarray(max_caps, dtype=float)
+        # Przy każdej porażce przechodzimy cały łańcuch ECOS -> SCS (SLSQP to już
+        # fallback w CloudAllocator); ostatni skuteczny solver tylko otwiera kolejkę
+        order = self.SOLVERS if self.solver is None else \
+            (self.solver,) + tuple(s for s in self.SOLVERS if s != self.solver)
+        for solver in order:
+            try:
+                # x.value z poprzedniego wywołania jako punkt startowy - korzysta z niego tylko SCS
+                self._run(solver, telemetry, warm_start=solver == 'SCS')
+            except Exception:
+                continue
+            if self.x.value is not None:
+                self.solver = solver
+                return self.x.value
+        return None
+
+    def _run(self, solver, telemetry, warm_start=False):
+        opts = {'eps': 1e-3} if solver == 'SCS' else {}
+        start = time.perf_counter()
+        try:
+            self.prob.solve(solver=solver, warm_start=warm_start, **opts)
+        except Exception as e:
+            if telemetry: telemetry.record_call(f"cvxpy-{solver}", time.perf_counter() - start, False, type(e).__name__)
+            raise
+        if telemetry:
+            ok = self.x.value is not None
+            telemetry.record_call(f"cvxpy-{solver}", time.perf_counter() - start, ok, None if ok else f"status {self.prob.status}")
+
+# LRU po (n, limity) - długie przebiegi po wielu n nie rosną bez końca
+CVXPY_CACHE_SIZE = 64
+_compiled_cache = OrderedDict()
+
+def get_compiled_nbs(n, capped=False):
+    key = (n, capped)
+    if key in _compiled_cache:
+        _compiled_cache.move_to_end(key)
+        return _compiled_cache[key]
+    compiled = CompiledNBSProblem(n, capped)
+    _compiled_cache[key] = compiled
+    if len(_compiled_cache) > CVXPY_CACHE_SIZE:
+        _compiled_cache.popitem(last=False)
+    return compiled
+
+# --- WERYFIKACJA WATER-FILLINGU ---
+# Losowe instancje (wagi losowe, częściowo zerowe, z limitami i bez) rozwiązane
+# natywnie i przez cvxpy. Przy wadze 0 rozwiązanie nie jest jednoznaczne
+# (natywnie użytkownik zostaje na m_i), więc porównujemy wartość celu
+# i wykonalność. Zwraca największą przewagę celu cvxpy nad water-fillingiem.
+def verify_water_filling(trials=40, n=20, seed=0):
+    import cvxpy as cp
+    rng = np.random.default_rng(seed)
+    worst = 0.0
+    for trial in range(trials):
+        m = rng.uniform(1.0, 10.0, n)
+        w = rng.uniform(0.1, 2.0, n)
+        if trial % 2: w[rng.random(n) < 0.3] = 0.0
+        # limity około równego podziału nadwyżki - część rzędów idzie przez bisekcję
+        caps = m + rng.uniform(0.0, 15.0, n) if trial % 4 >= 2 else None
+        capacity = m.sum() + 5.0 * n * rng.uniform(0.5, 1.5)
+        x = water_filling_nbs(m, capacity, w, caps)
+        if x is None or np.any(np.isnan(x)):
+            raise AssertionError(f"instancja {trial}: wykonalna, a water-filling nie zwrócił rozwiązania")
+        top = caps if caps is not None else np.inf
+        if np.sum(x) > capacity * (1 + 1e-9) or np.any(x < m - 1e-9) or np.any(x > top + 1e-9):
+            raise AssertionError(f"instancja {trial}: rozwiązanie niewykonalne")
+        pos = w > 0
+        xv = cp.Variable(n)
+        constraints = [cp.sum(xv) <= capacity, xv >= m]
+        if caps is not None: constraints.append(xv <= caps)
+        cp.Problem(cp.Maximize(w[pos] @ cp.log(xv[pos] - m[pos])), constraints).solve()
+        objective = lambda v: float(np.sum(w[pos] * np.log(v[pos] - m[pos])))
+        worst = max(worst, objective(xv.value) - objective(x))
+    return worst
 
 # --- KLASA OBLICZENIOWA ---
 class CloudAllocator:
-    def __init__(self, total_capacity):
+    def __init__(self, total_capacity, telemetry=None):
         self.capacity = total_capacity
+        self.telemetry = telemetry
+
+    # Metryki liczone wzdłuż osi `axis` - dla macierzy (iterations x n)
+    # dostajemy wektor wyników, po jednym na wiersz.
 
     # 1. KRYTERIUM SPRAWIEDLIWOŚCI (Jain's Index)
-    def calculate_jains_index(self, allocations):
-        if len(allocations) == 0: return 0
-        total = np.sum(allocations)
-        if total <= 1e-9: return 0
+    def calculate_jains_index(self, allocations, axis=-1):
+        allocations = np.asarray(allocations)
+        if allocations.size == 0: return 0
+        total = np.sum(allocations, axis=axis)
         numerator = total ** 2
-        denominator = len(allocations) * np.sum(allocations ** 2)
-        return numerator / denominator
+        denominator = allocations.shape[axis] * np.sum(allocations ** 2, axis=axis)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(total <= 1e-9, 0.0, numerator / denominator)[()]
 
     # 2. KRYTERIUM CZASOWE (Makespan - Czas wykonania najwolniejszego zadania)
-    def calculate_makespan(self, allocations, min_reqs):
+    def calculate_makespan(self, allocations, min_reqs, axis=-1):
         # Zakładamy: Workload ~ min_reqs. 
         # Czas = Workload / Przydzielone Zasoby
         # Unikamy dzielenia przez zero
         safe_allocs = np.maximum(allocations, 1e-9)
         execution_times = min_reqs / safe_allocs
-        return np.max(execution_times) # Makespan to czas najwolniejszego
+        return np.max(execution_times, axis=axis) # Makespan to czas najwolniejszego
 
     # 3. KRYTERIUM Z PRACY NAUKOWEJ (Total Utility / Nash Product)
-    def calculate_system_utility(self, allocations, min_reqs):
+    def calculate_system_utility(self, allocations, min_reqs, axis=-1):
         # Wg pracy Wei et al., i naszego solvera NBS:
         # Maksymalizujemy iloczyn nadwyżek (lub sumę logarytmów).
         # To jest miara "zadowolenia" systemu z punktu widzenia Teorii Gier.
         surplus = allocations - min_reqs
         # Zabezpieczenie logarytmu
         safe_surplus = np.maximum(surplus, 1e-9)
-        return np.sum(np.log(safe_surplus))
+        return np.sum(np.log(safe_surplus), axis=axis)
 
-    def solve_wei_nbs(self, min_reqs):
+    def solve_wei_nbs(self, min_reqs, weights=None, max_caps=None, backend='native'):
+        # backend - klucz SOLVER_BACKENDS (native / cvxpy / scipy)
+        return getattr(self, SOLVER_BACKENDS[backend])(min_reqs, weights, max_caps)
+
+    def _solve_wei_nbs_native(self, min_reqs, weights=None, max_caps=None):
+        if self.telemetry is None: return water_filling_nbs(min_reqs, self.capacity, weights, max_caps)
+        start = time.perf_counter()
+        x = water_filling_nbs(min_reqs, self.capacity, weights, max_caps)
+        self.telemetry.record_call('native', time.perf_counter() - start, x is not None,
+                                   None if x is not None else 'infeasible')
+        return x
+
+    def _solve_wei_nbs_cvxpy(self, min_reqs, weights=None, max_caps=None):
         n = len(min_reqs)
         if np.sum(min_reqs) > self.capacity: return None
+        w = np.ones(n) if weights is None else np.asarray(weights, dtype=float)
+        # jak w ścieżce natywnej - zła waga to błąd wywołującego, nie porażka solvera
+        if np.any(w < 0): raise ValueError("Wagi NBS muszą być nieujemne")
         
-        # Próba 1: CVXPY
+        # Próba 1: CVXPY (skompilowany problem z cache, ECOS -> SCS)
+        # Żaden błąd cvxpy (brak solvera, SolverError, problemy numeryczne, błąd
+        # kompilacji) nie przerywa przebiegu - trafia do telemetrii, a my
+        # przechodzimy do SLSQP
+        start = time.perf_counter()
         try:
-            x = cp.Variable(n)
-            surplus = x - min_reqs
-            objective = cp.Maximize(cp.sum(cp.log(surplus)))
-            constraints = [cp.sum(x) <= self.capacity, surplus >= 1e-7]
-            prob = cp.Problem(objective, constraints)
-            try: prob.solve(solver=cp.ECOS)
-            except: prob.solve(solver=cp.SCS, eps=1e-3)
-            
-            if x.value is not None: return np.maximum(x.value, min_reqs)
-        except: pass
+            compiled = get_compiled_nbs(n, max_caps is not None)
+            x = compiled.solve(min_reqs, self.capacity, w, max_caps, self.telemetry)
+            if x is not None: return np.maximum(x, min_reqs)
+        except Exception as e:
+            # błędy poza samym solverem (kompilacja, przypisanie parametrów)
+            if self.telemetry:
+                self.telemetry.record_call('cvxpy', time.perf_counter() - start, False, type(e).__name__)
         
         # Próba 2: SciPy
+        return self._solve_wei_nbs_slsqp(min_reqs, w, max_caps)
+
+    def _solve_wei_nbs_scipy(self, min_reqs, weights=None, max_caps=None):
+        if np.sum(min_reqs) > self.capacity: return None
+        w = np.ones(len(min_reqs)) if weights is None else np.asarray(weights, dtype=float)
+        if np.any(w < 0): raise ValueError("Wagi NBS muszą być nieujemne")
+        return self._solve_wei_nbs_slsqp(min_reqs, w, max_caps)
+
+    def _solve_wei_nbs_slsqp(self, min_reqs, w, max_caps=None):
+        from scipy.optimize import minimize
+        n = len(min_reqs)
+        start = time.perf_counter()
         try:
-            fun = lambda x: -np.sum(np.log(x - min_reqs + 1e-9))
+            fun = lambda x: -np.sum(w * np.log(x - min_reqs + 1e-9))
             cons = [{'type': 'eq', 'fun': lambda x: self.capacity - np.sum(x)}]
-            bnds = [(m, self.capacity) for m in min_reqs]
+            if max_caps is None: bnds = [(m, self.capacity) for m in min_reqs]
+            else: bnds = [(m, min(u, self.capacity)) for m, u in zip(min_reqs, max_caps)]
             x0 = min_reqs + (self.capacity - np.sum(min_reqs))/n
             res = minimize(fun, x0, method='SLSQP', bounds=bnds, constraints=cons)
-            if res.success: return res.x
-        except: pass
-        return None
+            # res.message rozróżnia np. limit iteracji od niespójnych ograniczeń
+            error = None if res.success else res.message
+        except (ValueError, ArithmeticError) as e:
+            res, error = None, type(e).__name__
+        if self.telemetry:
+            self.telemetry.record_call('SLSQP', time.perf_counter() - start, error is None, error)
+        return res.x if error is None else None
 
     def solve_proportional_surplus(self, min_reqs):
         total_req = np.sum(min_reqs)
@@ -80,36 +288,304 @@ class CloudAllocator:
         else:
             return min_reqs + (surplus_cap / len(min_reqs))
 
+    # Wersje wsadowe: min_reqs to macierz (iterations x n),
+    # self.capacity - skalar lub wektor pojemności (po jednej na wiersz).
+    # Wiersze bez rozwiązania zwracane są jako NaN.
+    def solve_wei_nbs_batch(self, min_reqs, weights=None, max_caps=None, backend='native'):
+        # backendy iteracyjne rozwiązują wiersz po wierszu; wagi i limity jak w
+        # ścieżce natywnej: wektor (n) wspólny dla wierszy albo macierz (iteracje x n)
+        if backend != 'native':
+            caps = np.broadcast_to(self.capacity, (len(min_reqs),))
+            ws = None if weights is None else np.broadcast_to(weights, np.shape(min_reqs))
+            us = None if max_caps is None else np.broadcast_to(max_caps, np.shape(min_reqs))
+            out = np.full(np.shape(min_reqs), np.nan)
+            for row, (reqs, cap) in enumerate(zip(min_reqs, caps)):
+                alloc = CloudAllocator(cap, self.telemetry).solve_wei_nbs(
+                    reqs, None if ws is None else ws[row], None if us is None else us[row], backend)
+                if alloc is not None: out[row] = alloc
+            return out
+        if self.telemetry is None: return water_filling_nbs_batch(min_reqs, self.capacity, weights, max_caps)
+        start = time.perf_counter()
+        out = water_filling_nbs_batch(min_reqs, self.capacity, weights, max_caps)
+        self.telemetry.record_call('native-batch', time.perf_counter() - start, not np.all(np.isnan(out)))
+        return out
+
+    def solve_proportional_surplus_batch(self, min_reqs):
+        min_reqs = np.asarray(min_reqs, dtype=float)
+        cap = np.broadcast_to(np.asarray(self.capacity, dtype=float), (len(min_reqs),))
+        total_req = np.sum(min_reqs, axis=1)
+        surplus_cap = np.maximum(cap - total_req, 0)
+        n = min_reqs.shape[1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shares = np.where(total_req[:, None] > 0, min_reqs / total_req[:, None], 1.0 / n)
+        out = min_reqs + shares * surplus_cap[:, None]
+        out[total_req > cap] = np.nan
+        return out
+
+# --- REJESTR BACKENDÓW NBS ---
+# nazwa -> metoda CloudAllocator; każda importuje swoją bibliotekę przy
+# pierwszym wywołaniu. Nowy backend = nowa metoda + wpis tutaj.
+SOLVER_BACKENDS = {
+    'native': '_solve_wei_nbs_native',  # analityczny water-filling (domyślny)
+    'cvxpy': '_solve_wei_nbs_cvxpy',    # ECOS -> SCS -> SLSQP, do weryfikacji
+    'scipy': '_solve_wei_nbs_scipy',    # sam SLSQP
+}
+
 # --- SYMULATOR ---
+# Generator dla zadania (n, iteracja): gałąź drzewa SeedSequence o kluczu
+# (n, it) - ten sam mechanizm co SeedSequence.spawn, ale adresowany jawnie,
+# więc wynik nie zależy od kolejności zadań ani od liczby procesów.
+def task_rng(entropy, n, iteration):
+    return np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(n, iteration)))
+
+# Uruchamiane w procesie roboczym puli - zwraca surowe wiersze wyników i telemetrię
+def _run_block(task):
+    params, n, iterations, batched = task
+    sim = SimulationExperiment(**params)
+    sim.results = ResultsStore(chunk_size=max(64, 2 * len(iterations)))
+    sim.run_block(n, iterations, batched)
+    return sim.results.columns(), sim.telemetry.to_dict()
+
 class SimulationExperiment:
-    def __init__(self, multiplier, req_min, req_max):
-        self.results = []
+    def __init__(self, multiplier, req_min, req_max, solver='native', seed=None, raw_dir=None,
+                 cache=None, keep_raw=True, quantiles=(), trace=None, raw_mode=None):
+        # raw_dir: katalog na surowe wyniki (porcje .npz); None -> w pamięci
+        # cache: ResultCache - używany tylko przy jawnym seedzie (inaczej nie ma trafień)
+        # keep_raw=False: tylko agregaty (stała pamięć niezależnie od liczby iteracji)
+        # raw_mode: None / 'resume' / 'overwrite' - co zrobić z porcjami już obecnymi w raw_dir
+        # trace: opis śladu z trace_spec() - wymagania z okien śladu zamiast U(req_min, req_max)
+        self.results = None
+        if keep_raw:
+            self.results = ResultsStore(raw_dir, resume=raw_mode == 'resume', overwrite=raw_mode == 'overwrite')
+        self.stats = StreamingStats(quantiles)
+        self.cache = cache if seed is not None else None
+        self.telemetry = Telemetry()
+        self.sample_counts = {}  # n -> liczba iteracji (w trybie adaptacyjnym różna dla punktów)
+        self.solver = solver
         self.multiplier = multiplier
         self.req_min = req_min
         self.req_max = req_max
+        self.trace = trace
+        # seed=None -> losowa entropia (do odtworzenia przebiegu przez --seed)
+        self.seed = np.random.SeedSequence(seed).entropy
+
+    def params(self):
+        return {'multiplier': self.multiplier, 'req_min': self.req_min, 'req_max': self.req_max,
+                'solver': self.solver, 'seed': self.seed, 'trace': self.trace}
+
+    def run(self, max_users, step, iterations, batched=False, workers=1, adaptive=None):
+        # adaptive: None -> stałe `iterations` na każde n; inaczej słownik
+        # {'target', 'min_iter', 'max_iter', 'batch'} dla run_adaptive
+        if self.trace:
+            print(f"Start: M={self.multiplier}, Trace={self.trace['path']} ({self.trace['mode']}, "
+                  f"avg={self.trace['mean']:.3f}), Seed={self.seed}")
+        else:
+            print(f"Start: M={self.multiplier}, Range=[{self.req_min}-{self.req_max}], Seed={self.seed}")
+        ns = list(range(10, max_users + 1, step))
+        # jedna pula na cały przebieg - tryb adaptacyjny wykonuje wiele rund
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            if adaptive is None:
+                self.run_points({n: range(iterations) for n in ns}, batched, pool, workers)
+                self.sample_counts = dict.fromkeys(ns, iterations)
+            else:
+                self.run_adaptive(ns, batched, pool, workers, **adaptive)
+        finally:
+            if pool: pool.shutdown()
+
+    # Rundy po `batch` iteracji tylko dla punktów, których CI jest jeszcze za szeroki.
+    # Iteracja `it` ma zawsze ten sam scenariusz (task_rng), więc wynik nie zależy
+    # od podziału na rundy, a cache działa jak w trybie stałym.
+    def run_adaptive(self, ns, batched, pool, workers, target, min_iter=5, max_iter=200, batch=None, atol=0.0):
+        batch = batch or min_iter
+        done = dict.fromkeys(ns, 0)
+        pending = {n: range(min(min_iter, max_iter)) for n in ns}
+        while pending:
+            self.run_points(pending, batched, pool, workers)
+            for n, its in pending.items(): done[n] = its.stop
+            pending = {n: range(done[n], min(done[n] + batch, max_iter)) for n in ns
+                       if done[n] < max_iter and not self.converged(n, target, min_iter, atol)}
+        self.sample_counts = done
+
+    def converged(self, n, target, min_count=2, atol=0.0, confidence=0.95):
+        # szerokość CI (2 * połowa) <= max(target * |średnia|, atol) dla każdej metody i metryki;
+        # atol - próg bezwzględny dla metryk o średniej bliskiej zeru (np. Total_Utility),
+        # min_count - tyle udanych próbek musi mieć każda metoda, zanim CI coś znaczy
+        present = [method for code, method in enumerate(ResultsStore.METHODS) if (n, code) in self.stats.groups]
+        if not present: return False
+        for method in present:  # metoda bez rozwiązań - nie ma czego zawężać
+            for mean, half, count in self.stats.point(n, method, confidence).values():
+                if count < max(2, min_count) or np.isnan(half): return False
+                if 2 * half > max(target * abs(mean), atol): return False
+        return True
+
+    def load_raw(self):
+        # agregaty z porcji zapisanych wcześniej (także przez przerwany przebieg);
+        # wczytywana jest naraz jedna porcja
+        for chunk in self.results.iter_chunks(): self.emit_stats(chunk)
+
+    def run_points(self, points, batched, pool, workers):
+        plan, hits, todo = self.plan_points(points, batched)
+        if pool is None:
+            self._collect(plan, hits, map(_run_block, todo))
+            return
+        chunk = max(1, len(todo) // (workers * 4))
+        # map zachowuje kolejność -> wyniki identyczne jak dla workers=1
+        self._collect(plan, hits, pool.map(_run_block, todo, chunksize=chunk))
+
+    def plan_points(self, points, batched):
+        # points: n -> range iteracji do policzenia
+        # Zwraca (plan, trafienia cache, zadania dla _run_block w kolejności planu)
+        # Tryb wsadowy: blok = wszystkie iteracje danego n; zwykły: blok = jedna iteracja
+        blocks = []
+        for n, its in points.items():
+            if batched: blocks.append((n, its))
+            else: blocks.extend((n, range(it, it + 1)) for it in its)
+
+        hits = {}
+        if self.cache:
+            with self.telemetry.phase('cache'): hits = self.cache_lookup(blocks)
+        plan = []
+        for n, its in blocks:
+            missing = [it for it in its if (n, it) not in hits]
+            plan.append((n, its, missing))
+        todo = [(self.params(), n, missing, batched) for n, _, missing in plan if missing]
+        if self.cache:
+            print(f"Cache: {len(blocks) - len(todo)}/{len(blocks)} bloków gotowych, do policzenia: {len(todo)}")
+        return plan, hits, todo
+
+    def report_samples(self):
+        total = sum(self.sample_counts.values())
+        print(f"Próbki na punkt (łącznie {total}):")
+        for n, count in self.sample_counts.items():
+            widths = []
+            for method in ResultsStore.METHODS:
+                if (n, ResultsStore.METHODS.index(method)) not in self.stats.groups: continue
+                for mean, half, _ in self.stats.point(n, method).values():
+                    widths.append(2 * half / abs(mean) if mean else np.nan)
+            print(f"  n={n:<6} {count:>6} iteracji, maks. względna szerokość CI {np.nanmax(widths):.4f}")
+
+    def _collect(self, plan, hits, computed):
+        from tqdm import tqdm
+        try:
+            for n, its, missing in tqdm(plan):
+                cached = [it for it in its if (n, it) in hits]
+                if cached: self.emit(self._cached_columns(n, cached, hits))
+                if missing:
+                    rows, telemetry = next(computed)
+                    self.telemetry.merge(telemetry)
+                    self.emit(rows)
+                    if self.cache:
+                        with self.telemetry.phase('cache'): self.cache_store(n, missing, rows)
+        except BaseException:
+            # przerwany przebieg (Ctrl+C, błąd procesu roboczego): niepełna porcja
+            # trafia na dysk, inaczej giną wiersze zebrane od ostatniego flush()
+            if self.results is not None: self.results.flush()
+            raise
+
+    def emit(self, columns):
+        self.emit_stats(columns)
+        if self.results is not None: self.results.extend_columns(columns)
+
+    def emit_stats(self, columns):
+        with self.telemetry.phase('aggregate'): self.stats.update(columns)
+
+    def point_keys(self, n, iteration):
+        params = self.params()
+        return [ResultCache.key(params, method, n, iteration) for method in ResultsStore.METHODS]
+
+    def cache_lookup(self, blocks):
+        # (n, it) -> wyniki obu metod, tylko dla punktów w pełni obecnych w cache
+        points = [(n, it) for n, its in blocks for it in its]
+        keys = [self.point_keys(n, it) for n, it in points]
+        found = self.cache.get_many([k for pair in keys for k in pair])
+        return {pt: [found[k] for k in pair] for pt, pair in zip(points, keys)
+                if all(k in found for k in pair)}
+
+    def _cached_columns(self, n, iterations, hits):
+        for code, method in enumerate(ResultsStore.METHODS):
+            dropped = sum(hits[(n, it)][code][0] is None for it in iterations)
+            if dropped: self.telemetry.skip(method, dropped)
+        rows = [(it, code) + tuple(hits[(n, it)][code]) for it in iterations
+                for code in range(len(ResultsStore.METHODS)) if hits[(n, it)][code][0] is not None]
+        it_col, code_col, f, m, u = (np.array(c) for c in zip(*rows)) if rows else [np.empty(0)] * 5
+        return {'N_Users': np.full(len(rows), n), 'Iteration': it_col, 'Method': code_col,
+                'Fairness': f, 'Makespan': m, 'Total_Utility': u}
+
+    def cache_store(self, n, iterations, rows):
+        # zapis także punktów bez rozwiązania (NULL), żeby nie liczyć ich ponownie
+        got = {(int(it), int(code)): (float(f), float(m), float(u)) for it, code, f, m, u in zip(
+            rows['Iteration'], rows['Method'], rows['Fairness'], rows['Makespan'], rows['Total_Utility'])}
+        items = []
+        for it in iterations:
+            for code, key in enumerate(self.point_keys(n, it)):
+                items.append((key,) + got.get((it, code), (None, None, None)))
+        self.cache.put_many(items)
 
-    def run(self, max_users, step, iterations):
-        print(f"Start: M={self.multiplier}, Range=[{self.req_min}-{self.req_max}]")
-        for n in tqdm(range(10, max_users + 1, step)):
-            for _ in range(iterations):
-                avg = (self.req_min + self.req_max) / 2
+    def scenario(self, n, iteration):
+        rng = task_rng(self.seed, n, iteration)
+        if self.trace: return open_trace(self.trace).window(n, iteration, rng)
+        return rng.uniform(self.req_min, self.req_max, n)
+
+    def mean_req(self):
+        # średnie wymaganie - podstawa pojemności (n * avg * multiplier)
+        if self.trace: return self.trace['mean']
+        return (self.req_min + self.req_max) / 2
+
+    def run_block(self, n, iterations, batched=False):
+        if batched: return self.run_batched(n, iterations)
+        phase = self.telemetry.phase
+        for it in iterations:
+            with phase('scenario'):
+                avg = self.mean_req()
                 cap = n * avg * self.multiplier
-                reqs = np.random.uniform(self.req_min, self.req_max, n)
+                reqs = self.scenario(n, it)
                 if np.sum(reqs) >= cap: cap = np.sum(reqs) * 1.05
-                
-                allocator = CloudAllocator(cap)
-                
-                # Wei
-                wei_alloc = allocator.solve_wei_nbs(reqs)
-                if wei_alloc is not None:
-                    self.record_result(n, 'Wei et al. (NBS)', wei_alloc, reqs, allocator)
-                
-                # Proportional
-                prop_alloc = allocator.solve_proportional_surplus(reqs)
-                if prop_alloc is not None:
-                    self.record_result(n, 'Proportional', prop_alloc, reqs, allocator)
-
-    def record_result(self, n, method, alloc, reqs, allocator):
+            
+            allocator = CloudAllocator(cap, self.telemetry)
+            
+            # Wei
+            with phase('solve_nbs'): wei_alloc = allocator.solve_wei_nbs(reqs, backend=self.solver)
+            if wei_alloc is not None:
+                with phase('metrics'): self.record_result(n, 'Wei et al. (NBS)', wei_alloc, reqs, allocator, it)
+            else: self.telemetry.skip('Wei et al. (NBS)')
+            
+            # Proportional
+            with phase('solve_proportional'): prop_alloc = allocator.solve_proportional_surplus(reqs)
+            if prop_alloc is not None:
+                with phase('metrics'): self.record_result(n, 'Proportional', prop_alloc, reqs, allocator, it)
+            else: self.telemetry.skip('Proportional')
+
+    # Wszystkie iteracje dla danego n naraz: jedna macierz (iterations x n).
+    # Wiersz `it` pochodzi z tego samego generatora co w trybie zwykłym.
+    def run_batched(self, n, iterations):
+        phase = self.telemetry.phase
+        with phase('scenario'):
+            avg = self.mean_req()
+            reqs = np.stack([self.scenario(n, it) for it in iterations])
+            sums = np.sum(reqs, axis=1)
+            cap = np.full(len(reqs), n * avg * self.multiplier)
+            cap = np.where(sums >= cap, sums * 1.05, cap)
+
+        allocator = CloudAllocator(cap, self.telemetry)
+        its = np.asarray(iterations)
+        with phase('solve_nbs'): wei_alloc = allocator.solve_wei_nbs_batch(reqs, backend=self.solver)
+        with phase('metrics'): self.record_batch(n, 'Wei et al. (NBS)', wei_alloc, reqs, allocator, its)
+        with phase('solve_proportional'): prop_alloc = allocator.solve_proportional_surplus_batch(reqs)
+        with phase('metrics'): self.record_batch(n, 'Proportional', prop_alloc, reqs, allocator, its)
+
+    def record_batch(self, n, method, alloc, reqs, allocator, iterations):
+        ok = ~np.isnan(alloc[:, 0])
+        if not np.all(ok): self.telemetry.skip(method, int(np.sum(~ok)))
+        if not np.any(ok): return
+        alloc, reqs, iterations = alloc[ok], reqs[ok], iterations[ok]
+        surplus = np.maximum(alloc - reqs, 0)
+        jain = allocator.calculate_jains_index(surplus)
+        makespan = allocator.calculate_makespan(alloc, reqs)
+        util = allocator.calculate_system_utility(alloc, reqs)
+        self.results.extend(n, iterations, method, jain, makespan, util)
+
+    def record_result(self, n, method, alloc, reqs, allocator, iteration=0):
         # 1. Fairness
         surplus = alloc - reqs
         surplus[surplus < 0] = 0
@@ -121,34 +597,37 @@ class SimulationExperiment:
         # 3. Utility (Paper's criterion)
         util = allocator.calculate_system_utility(alloc, reqs)
         
-        self.results.append({
-            'N_Users': n,
-            'Method': method,
-            'Fairness': jain,
-            'Makespan': makespan,
-            'Total_Utility': util
-        })
+        self.results.append(n, iteration, method, jain, makespan, util)
 
     def plot_all(self, base_filename):
-        if not self.results: return
-        df = pd.DataFrame(self.results)
+        with self.telemetry.phase('plot'): self._plot_all(base_filename)
+
+    def _plot_all(self, base_filename):
+        import matplotlib.pyplot as plt
+        if self.results is not None: self.results.flush()
+        if len(self.stats) == 0: return
         
         # Tworzymy 3 wykresy obok siebie (lub jeden pod drugim)
+        # Linie: średnia po iteracjach; pasmo: 95% przedział ufności t-Studenta
         fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+        for style, method in zip(('o-', 'X--'), ResultsStore.METHODS):
+            for ax, metric in zip(axes, StreamingStats.METRICS):
+                ns, mean, half = self.stats.series(method, metric)
+                line, = ax.plot(ns, mean, style, label=method)
+                ax.fill_between(ns, mean - half, mean + half, color=line.get_color(), alpha=0.2, linewidth=0)
+        for ax, metric in zip(axes, StreamingStats.METRICS):
+            ax.set_xlabel('N_Users'); ax.set_ylabel(metric); ax.legend(title='Method')
         
         # Wykres 1: Fairness (To co było)
-        sns.lineplot(data=df, x='N_Users', y='Fairness', hue='Method', style='Method', markers=True, ax=axes[0])
         axes[0].set_title('Kryterium 1: Sprawiedliwość (Jain\'s Index)')
         axes[0].set_ylim(0.5, 1.05)
         
         # Wykres 2: Makespan (Czas)
-        sns.lineplot(data=df, x='N_Users', y='Makespan', hue='Method', style='Method', markers=True, ax=axes[1])
         axes[1].set_title('Kryterium 2: Czas Wykonania (Makespan)')
         axes[1].set_ylabel('Czas (jednostki znormalizowane)')
         # Tu niższy wynik jest lepszy!
         
         # Wykres 3: Total Utility (Praca Wei)
-        sns.lineplot(data=df, x='N_Users', y='Total_Utility', hue='Method', style='Method', markers=True, ax=axes[2])
         axes[2].set_title('Kryterium 3: Globalna Użyteczność (Wei et al.)')
         axes[2].set_ylabel('Suma Logarytmów Nadwyżki')
         
@@ -156,6 +635,7 @@ class SimulationExperiment:
         path = os.path.join('results', 'full_metrics_' + base_filename)
         print(f"Zapisywanie: {path}")
         plt.savefig(path, dpi=300)
+        plt.close(fig)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -164,9 +644,79 @@ if __name__ == "__main__":
     parser.add_argument('--max_req', type=float, default=100.0)
     parser.add_argument('--users', type=int, default=60)
     parser.add_argument('--iter', type=int, default=15)
+    parser.add_argument('--solver', choices=list(SOLVER_BACKENDS), default='native')
+    parser.add_argument('--batched', action='store_true')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--raw-dir', default=None)
+    parser.add_argument('--overwrite-raw', action='store_true')  # usuń porcje poprzedniego przebiegu
+    parser.add_argument('--from-raw', action='store_true')       # agregaty i wykres z porcji w --raw-dir, bez symulacji
+    parser.add_argument('--cache', default=os.path.join('results', 'cache.sqlite'))
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--telemetry', default=None)
+    parser.add_argument('--no-raw', action='store_true')
+    parser.add_argument('--no-plot', action='store_true')
+    parser.add_argument('--quantiles', type=float, nargs='*', default=[])
+    parser.add_argument('--target-ci', type=float, default=None)
+    parser.add_argument('--min-iter', type=int, default=5)
+    parser.add_argument('--max-iter', type=int, default=200)
+    parser.add_argument('--adaptive-batch', type=int, default=None)
+    parser.add_argument('--ci-atol', type=float, default=0.0)  # bezwzględny próg szerokości CI (średnie bliskie zeru)
+    parser.add_argument('--trace', default=None)
+    parser.add_argument('--trace-dtype', default='float64')
+    parser.add_argument('--trace-column', type=int, default=None)
+    parser.add_argument('--trace-mode', choices=TraceSource.MODES, default='consecutive')
+    parser.add_argument('--convert-trace', nargs=2, metavar=('CSV', 'NPY'), default=None)
+    parser.add_argument('--csv-column', default=None)
+    parser.add_argument('--verify-nbs', type=int, default=None)  # liczba losowych instancji vs cvxpy
     args = parser.parse_args()
 
-    fname = f"M{args.multiplier}_R{int(args.min_req)}-{int(args.max_req)}.png"
-    sim = SimulationExperiment(args.multiplier, args.min_req, args.max_req)
-    sim.run(args.users, 10, args.iter)
-    sim.plot_all(fname)
\ No newline at end of file
+    if args.verify_nbs:
+        gap = verify_water_filling(args.verify_nbs, seed=args.seed or 0)
+        print(f"Water-filling vs cvxpy: {args.verify_nbs} instancji, maks. przewaga celu cvxpy = {gap:.2e}")
+        raise SystemExit
+
+    if args.convert_trace:
+        count = convert_csv_trace(*args.convert_trace, column=args.csv_column)
+        print(f"Zapisano {count} wymagań: {args.convert_trace[1]}")
+        raise SystemExit
+
+    trace = None
+    if args.trace:
+        trace = trace_spec(args.trace, args.trace_dtype, args.trace_column, args.trace_mode)
+        fname = f"M{args.multiplier}_T{os.path.splitext(os.path.basename(args.trace))[0]}.png"
+    else:
+        fname = f"M{args.multiplier}_R{int(args.min_req)}-{int(args.max_req)}.png"
+    raw_dir = args.raw_dir or os.path.join('results', 'raw_' + os.path.splitext(fname)[0])
+    if args.from_raw and args.no_raw: parser.error("--from-raw wymaga surowych porcji (bez --no-raw)")
+    raw_mode = 'resume' if args.from_raw else 'overwrite' if args.overwrite_raw else None
+    cache = None if args.no_cache or args.from_raw else ResultCache(args.cache)
+    try:
+        sim = SimulationExperiment(args.multiplier, args.min_req, args.max_req, args.solver, args.seed, raw_dir, cache,
+                                   keep_raw=not args.no_raw, quantiles=args.quantiles, trace=trace, raw_mode=raw_mode)
+    except FileExistsError as e:
+        raise SystemExit(str(e))
+    if args.from_raw:
+        if len(sim.results) == 0: raise SystemExit(f"{raw_dir}: brak porcji chunk_*.npz")
+        sim.load_raw()
+        print(f"Wczytano {len(sim.results)} wierszy z {raw_dir}")
+    else:
+        adaptive = None
+        if args.target_ci:
+            adaptive = {'target': args.target_ci, 'min_iter': args.min_iter, 'max_iter': args.max_iter,
+                        'batch': args.adaptive_batch, 'atol': args.ci_atol}
+        sim.run(args.users, 10, args.iter, batched=args.batched, workers=args.workers, adaptive=adaptive)
+        if adaptive: sim.report_samples()
+    if args.no_plot:
+        # tylko obliczenia: surowe porcje na dysk, bez matplotlib
+        if sim.results is not None: sim.results.flush()
+    else:
+        sim.plot_all(fname)
+    summary_path = os.path.join('results', 'summary_' + os.path.splitext(fname)[0] + '.csv')
+    sim.stats.save_csv(summary_path)
+    print(f"Agregaty: {summary_path}")
+
+    print(sim.telemetry.summary())
+    telemetry_path = args.telemetry or os.path.join('results', 'telemetry_' + os.path.splitext(fname)[0] + '.json')
+    sim.telemetry.save(telemetry_path)
+    print(f"Telemetria: {telemetry_path}")
\ No newline at end of file
@@ -0,0 +1,212 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# --- ALOKACJA NA WIELU WĘZŁACH (ADMM) ---
+# Użytkownik i może dostać zasoby tylko z dozwolonych węzłów j (krawędzie i-j):
+#   max sum_i w_i log(X_i - m_i),  X_i = sum_j x_ij
+#   przy sum_i x_ij <= C_j,  x_ij >= 0
+# Rozdzielenie ADMM (postać skalowana) na kopię węzłową x i użytkownika z, x = z:
+#   blok węzłów:       x_.j = rzut (z - u)_.j na {x >= 0, sum x <= C_j}
+#                      - niezależnie dla każdego węzła, w puli procesów
+#   blok użytkowników: z_i. = v + d * 1, v = (x + u)_i., gdzie d > 0 spełnia
+#                      k d^2 + (sum v - m_i) d - w_i / rho = 0 (k = liczba węzłów i)
+#                      - postać zamknięta, wektorowo dla wszystkich naraz
+#   u += x - z
+# rho dostraja się wg równowagi residuów (Boyd et al., 3.4.1). Ceny węzłów
+# (zmienne dualne pojemności) to rho * u na aktywnych krawędziach.
+
+# Segmentowy rzut na {x >= 0, sum x <= C} - krawędzie posortowane po węźle,
+# `starts` to początki niepustych segmentów.
+def project_capped_simplex(v, starts, caps):
+    counts = np.diff(np.append(starts, len(v)))
+    seg = np.repeat(np.arange(len(starts)), counts)
+    x = np.maximum(v, 0)
+    over = np.add.reduceat(x, starts) > caps
+    if not np.any(over): return x
+    # przekroczone węzły: próg tau z wartościami posortowanymi malejąco w segmencie
+    order = np.lexsort((-v, seg))
+    vs = v[order]
+    cs = np.cumsum(vs)
+    before = np.concatenate(([0.0], cs[starts[1:] - 1]))
+    rank = np.arange(1, len(v) + 1) - np.repeat(starts, counts)
+    tau_k = (cs - np.repeat(before, counts) - caps[seg]) / rank
+    active = np.where(vs > tau_k, np.arange(len(v)), -1)
+    tau = tau_k[np.maximum.reduceat(active, starts)]
+    return np.where(over[seg], np.maximum(v - tau[seg], 0), x)
+
+# Bloki węzłów w procesach roboczych: struktura stała wysyłana raz (initializer),
+# w każdej iteracji płyną tylko wartości krawędzi.
+_node_blocks = None
+
+def _init_node_blocks(blocks):
+    global _node_blocks
+    _node_blocks = blocks
+
+def _project_block(task):
+    block, v = task
+    starts, caps = _node_blocks[block]
+    return project_capped_simplex(v, starts, caps)
+
+class PartitionedAllocator:
+    def __init__(self, capacities, edge_users, edge_nodes, num_users=None):
+        # krawędzie (użytkownik, węzeł) - sortowane po węźle dla bloku węzłów
+        order = np.lexsort((edge_users, edge_nodes))
+        self.users = np.asarray(edge_users)[order]
+        self.nodes = np.asarray(edge_nodes)[order]
+        self.capacity = np.asarray(capacities, dtype=float)
+        self.num_users = num_users if num_users is not None else int(self.users.max()) + 1
+        self.num_nodes = len(self.capacity)
+        node_ids, self.starts = np.unique(self.nodes, return_index=True)
+        self.node_ids = node_ids
+        self.degree = np.bincount(self.users, minlength=self.num_users)
+
+    @classmethod
+    def from_mask(cls, capacities, mask):
+        # mask: (n x J) - czy użytkownik i może korzystać z węzła j
+        users, nodes = np.nonzero(mask)
+        return cls(capacities, users, nodes, num_users=np.shape(mask)[0])
+
+    def _blocks(self, workers):
+        # podział węzłów na ciągłe bloki o podobnej liczbie krawędzi
+        parts = max(1, min(workers, len(self.starts)))
+        cuts = np.searchsorted(self.starts, np.linspace(0, len(self.users), parts + 1)[1:-1])
+        bounds = [0, *np.unique(cuts).tolist(), len(self.starts)]
+        blocks, slices = [], []
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            if a == b: continue
+            lo = self.starts[a]
+            hi = self.starts[b] if b < len(self.starts) else len(self.users)
+            blocks.append((self.starts[a:b] - lo, self.capacity[self.node_ids[a:b]]))
+            slices.append(slice(lo, hi))
+        return blocks, slices
+
+    def _user_step(self, v, min_reqs, weights, rho):
+        a = np.bincount(self.users, weights=v, minlength=self.num_users) - min_reqs
+        k = np.maximum(self.degree, 1)
+        # stabilny pierwiastek równania kwadratowego (a może być duże i dodatnie)
+        disc = np.sqrt(a * a + 4 * k * weights / rho)
+        d = np.where(a > 0, 2 * weights / rho / (a + disc), (disc - a) / (2 * k))
+        return v + d[self.users]
+
+    def solve(self, min_reqs, weights=None, rho=None, tol=1e-6, max_iter=5000, workers=1):
+        m = np.asarray(min_reqs, dtype=float)
+        w = np.ones(self.num_users) if weights is None else np.asarray(weights, dtype=float)
+        if np.any((self.degree == 0) & (m > 0)): raise ValueError("Użytkownik z wymaganiem bez dozwolonego węzła")
+        if rho is None:
+            # skala: krzywizna log przy równym podziale nadwyżki, w / S^2
+            surplus = max(float(self.capacity.sum() - m.sum()), 1e-9) / self.num_users
+            rho = float(np.mean(w)) / surplus ** 2
+        edges = len(self.users)
+        # start: minimum użytkownika rozłożone równo na jego węzły
+        x = (m / np.maximum(self.degree, 1))[self.users]
+        z, u = x.copy(), np.zeros(edges)
+        blocks, slices = self._blocks(workers)
+        pool = None
+        if workers > 1 and len(blocks) > 1:
+            pool = ProcessPoolExecutor(max_workers=len(blocks), initializer=_init_node_blocks, initargs=(blocks,))
+        else:
+            _init_node_blocks(blocks)
+
+        history = []
+        converged = False
+        try:
+            for it in range(1, max_iter + 1):
+                v = z - u
+                tasks = [(b, v[s]) for b, s in enumerate(slices)]
+                parts = pool.map(_project_block, tasks) if pool else map(_project_block, tasks)
+                x = np.concatenate(list(parts))
+                z_old = z
+                z = self._user_step(x + u, m, w, rho)
+                u += x - z
+                # residua: pierwotne (zgodność kopii) i dualne (zmiana z)
+                r = np.linalg.norm(x - z)
+                s = rho * np.linalg.norm(z - z_old)
+                eps_pri = np.sqrt(edges) * tol + tol * max(np.linalg.norm(x), np.linalg.norm(z))
+                eps_dual = np.sqrt(edges) * tol + tol * rho * np.linalg.norm(u)
+                history.append((r, s))
+                if r <= eps_pri and s <= eps_dual:
+                    converged = True
+                    break
+                if r > 10 * s: rho *= 2; u /= 2
+                elif s > 10 * r: rho /= 2; u *= 2
+        finally:
+            if pool: pool.shutdown()
+
+        totals = np.bincount(self.users, weights=x, minlength=self.num_users)
+        prices = np.zeros(self.num_nodes)
+        prices[self.node_ids] = np.maximum.reduceat(rho * u, self.starts)
+        return {'x': x, 'totals': totals, 'prices': prices, 'iterations': it, 'converged': converged,
+                'residuals': np.array(history)}
+
+    def objective(self, totals, min_reqs, weights=None):
+        w = np.ones(self.num_users) if weights is None else np.asarray(weights, dtype=float)
+        return float(np.sum(w * np.log(np.maximum(totals - min_reqs, 1e-12))))
+
+    def solve_centralized(self, min_reqs, weights=None):
+        # jeden problem cvxpy na wszystkich krawędziach - referencja dla małych instancji
+        import cvxpy as cp
+        import scipy.sparse as sp
+
+        w = np.ones(self.num_users) if weights is None else np.asarray(weights, dtype=float)
+        edges = len(self.users)
+        by_user = sp.csr_matrix((np.ones(edges), (self.users, np.arange(edges))), shape=(self.num_users, edges))
+        by_node = sp.csr_matrix((np.ones(edges), (self.nodes, np.arange(edges))), shape=(self.num_nodes, edges))
+        x = cp.Variable(edges, nonneg=True)
+        prob = cp.Problem(cp.Maximize(w @ cp.log(by_user @ x - min_reqs)), [by_node @ x <= self.capacity])
+        prob.solve(solver=cp.CLARABEL)
+        return x.value
+
+# Losowa instancja: każdy użytkownik ma 1..max_nodes dozwolonych węzłów,
+# pojemności węzłów losowe, łącznie multiplier * sum(m)
+def random_instance(users, nodes, max_nodes, multiplier, req_min, req_max, rng):
+    m = rng.uniform(req_min, req_max, users)
+    k = rng.integers(1, max_nodes + 1, users)
+    edge_users = np.repeat(np.arange(users), k)
+    edge_nodes = rng.integers(0, nodes, len(edge_users))
+    # duplikaty krawędzi (ten sam węzeł wylosowany dwa razy) scalamy
+    pairs = np.unique(edge_users.astype(np.int64) * nodes + edge_nodes)
+    edge_users, edge_nodes = pairs // nodes, pairs % nodes
+    # pojemność węzła: jego udział w wymaganiach (zawsze wykonalne) + losowy zapas
+    share = np.bincount(edge_nodes, weights=(m / np.bincount(edge_users, minlength=users))[edge_users],
+                        minlength=nodes)
+    extra = rng.uniform(0.5, 1.5, nodes)
+    capacity = share + (multiplier - 1) * m.sum() * extra / extra.sum()
+    return PartitionedAllocator(capacity, edge_users, edge_nodes, users), m
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--nodes', type=int, default=200)
+    parser.add_argument('--max-nodes', type=int, default=3)  # maks. liczba dozwolonych węzłów na użytkownika
+    parser.add_argument('--multiplier', type=float, default=1.5)
+    parser.add_argument('--min_req', type=float, default=1.0)
+    parser.add_argument('--max_req', type=float, default=100.0)
+    parser.add_argument('--tol', type=float, default=1e-6)
+    parser.add_argument('--max-iter', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--check', action='store_true')  # porównanie z rozwiązaniem scentralizowanym
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    allocator, m = random_instance(args.users, args.nodes, args.max_nodes, args.multiplier,
+                                   args.min_req, args.max_req, rng)
+    print(f"Start: {args.users} użytkowników, {args.nodes} węzłów, {len(allocator.users)} krawędzi")
+    start = time.perf_counter()
+    result = allocator.solve(m, tol=args.tol, max_iter=args.max_iter, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    status = 'zbieżny' if result['converged'] else 'limit iteracji'
+    print(f"ADMM: {result['iterations']} iteracji ({status}) w {elapsed:.2f} s")
+    print(f"  cel = {allocator.objective(result['totals'], m):.6f}")
+    print(f"  min(X_i - m_i) = {np.min(result['totals'] - m):.3e}, "
+          f"maks. przekroczenie pojemności = {np.max(np.bincount(allocator.nodes, result['x'], args.nodes) - allocator.capacity):.3e}")
+    if args.check:
+        start = time.perf_counter()
+        ref = allocator.solve_centralized(m)
+        ref_totals = np.bincount(allocator.users, weights=ref, minlength=args.users)
+        print(f"Scentralizowany (CLARABEL): {time.perf_counter() - start:.2f} s, "
+              f"cel = {allocator.objective(ref_totals, m):.6f}")
+        print(f"  maks. |X_admm - X_ref| = {np.max(np.abs(result['totals'] - ref_totals)):.3e}")
@@ -0,0 +1,168 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from algorytm_global_2 import CloudAllocator, water_filling_nbs_batch
+
+# --- ALOKATOR WIELOZASOBOWY (CPU / pamięć / sieć) ---
+# Wymagania to macierz (n x d), pojemności - wektor d. Wszystkie metody
+# przyjmują też paczki instancji: wymagania (..., n, d), pojemności (..., d).
+# NBS:  max sum_i sum_k w_i log(x_ik - m_ik)  przy  sum_i x_ik <= C_k
+#       Cel i ograniczenia rozdzielają się po wymiarach, więc każdy wymiar
+#       to osobny water-filling - wszystkie (instancja, wymiar) naraz jednym
+#       wywołaniem water_filling_nbs_batch.
+# DRF:  minima najpierw, nadwyżka S_k = C_k - sum_i m_ik dzielona jednym
+#       poziomem Dominant Resource Fairness: użytkownik dostaje t_i * m_i, przy
+#       równych udziałach dominujących t_i * max_k(m_ik / S_k) = s; s rośnie, aż
+#       pierwszy zasób się wyczerpie (bez ponownego rozdziału resztek).
+# Proportional: nadwyżka każdego wymiaru proporcjonalnie do m_ik.
+# Instancje niewykonalne (sum_i m_ik > C_k w którymś wymiarze) zwracane są jako NaN.
+class MultiResourceAllocator:
+    def __init__(self, capacities):
+        self.capacity = np.asarray(capacities, dtype=float)
+
+    def _prepare(self, min_reqs):
+        m = np.asarray(min_reqs, dtype=float)
+        cap = np.broadcast_to(self.capacity, m.shape[:-2] + m.shape[-1:])
+        surplus = cap - np.sum(m, axis=-2)
+        infeasible = np.any(surplus < 0, axis=-1)
+        return m, cap, surplus, infeasible
+
+    def solve_nbs(self, min_reqs, weights=None, max_caps=None):
+        # weights: (..., n) wspólne dla wymiarów; max_caps: (..., n, d)
+        m, cap, _, infeasible = self._prepare(min_reqs)
+        n, d = m.shape[-2:]
+        lead = m.shape[:-2]
+        # wiersze water-fillingu = (instancja, wymiar)
+        rows = np.swapaxes(m, -1, -2).reshape(-1, n)
+        w = None
+        if weights is not None:
+            w = np.broadcast_to(np.asarray(weights, dtype=float)[..., None, :], lead + (d, n)).reshape(-1, n)
+        u = None
+        if max_caps is not None:
+            u = np.swapaxes(np.broadcast_to(np.asarray(max_caps, dtype=float), m.shape), -1, -2).reshape(-1, n)
+        x = water_filling_nbs_batch(rows, cap.reshape(-1), w, u)
+        x = np.swapaxes(x.reshape(lead + (d, n)), -1, -2)
+        x[infeasible] = np.nan
+        return x
+
+    def solve_drf(self, min_reqs):
+        m, _, surplus, infeasible = self._prepare(min_reqs)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # udział dominujący jednostki zadania w nadwyżce; S_k = 0 przy m_ik > 0 -> inf
+            ratios = np.where(m > 0, m / surplus[..., None, :], 0.0)
+            dominant = np.max(ratios, axis=-1)
+            inv = np.where(np.isfinite(dominant) & (dominant > 0), 1.0 / dominant, 0.0)
+            # sum_i t_i m_ik = s * sum_i m_ik / dominant_i <= S_k
+            demand = np.sum(m * inv[..., None], axis=-2)
+            level = np.min(np.where(demand > 0, surplus / demand, np.inf), axis=-1)
+        level = np.where(np.isfinite(level), level, 0.0)
+        x = m + (level[..., None] * inv)[..., None] * m
+        x[infeasible] = np.nan
+        return x
+
+    def solve_proportional(self, min_reqs):
+        m, _, surplus, infeasible = self._prepare(min_reqs)
+        total = np.sum(m, axis=-2, keepdims=True)
+        n = m.shape[-2]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shares = np.where(total > 0, m / total, 1.0 / n)
+        x = m + shares * np.maximum(surplus, 0)[..., None, :]
+        x[infeasible] = np.nan
+        return x
+
+    # Metryki jak w CloudAllocator, liczone naraz dla wszystkich instancji:
+    #   fairness           - Jain nadwyżki w każdym wymiarze (..., d)
+    #   dominant_fairness  - Jain dominujących udziałów nadwyżki (..., )
+    #   makespan           - czas najwolniejszego zadania; zadanie czeka na
+    #                        swój najwęższy zasób: max_k m_ik / x_ik
+    #   utility            - suma logarytmów nadwyżki po użytkownikach i wymiarach
+    def metrics(self, allocations, min_reqs):
+        x = np.asarray(allocations, dtype=float)
+        m = np.asarray(min_reqs, dtype=float)
+        base = CloudAllocator(self.capacity)
+        surplus = np.maximum(x - m, 0)
+        pool = np.broadcast_to(self.capacity, m.shape[:-2] + m.shape[-1:]) - np.sum(m, axis=-2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dominant = np.max(np.where(pool[..., None, :] > 0, surplus / pool[..., None, :], 0.0), axis=-1)
+        return {'fairness': base.calculate_jains_index(surplus, axis=-2),
+                'dominant_fairness': base.calculate_jains_index(dominant, axis=-1),
+                'makespan': np.max(m / np.maximum(x, 1e-9), axis=(-2, -1)),
+                'utility': np.sum(np.log(np.maximum(surplus, 1e-9)), axis=(-2, -1))}
+
+METHODS = {'NBS': 'solve_nbs', 'DRF': 'solve_drf', 'Proportional': 'solve_proportional'}
+
+# Losowe instancje: rozmiar zadania U(req_min, req_max) rozłożony na wymiary
+# profilem z rozkładu Dirichleta (zadania "CPU-ciężkie", "pamięciożerne", ...).
+# Średnio m_ik = avg, więc pojemność = n * avg * multiplier jak w symulatorze 1-D.
+def random_requirements(rng, iterations, n, d, req_min, req_max, concentration=1.0):
+    size = rng.uniform(req_min, req_max, (iterations, n, 1))
+    profile = rng.dirichlet(np.full(d, concentration), (iterations, n))
+    return size * profile * d
+
+def run_sweep(max_users, step, iterations, d, multiplier, req_min, req_max, seed=None):
+    rng = np.random.default_rng(seed)
+    avg = (req_min + req_max) / 2
+    rows = []
+    for n in range(10, max_users + 1, step):
+        reqs = random_requirements(rng, iterations, n, d, req_min, req_max)
+        sums = np.sum(reqs, axis=1)
+        cap = np.full(sums.shape, n * avg * multiplier)
+        cap = np.where(sums >= cap, sums * 1.05, cap)
+        allocator = MultiResourceAllocator(cap)
+        for name, solver in METHODS.items():
+            start = time.perf_counter()
+            alloc = getattr(allocator, solver)(reqs)
+            elapsed = time.perf_counter() - start
+            metrics = allocator.metrics(alloc, reqs)
+            rows.append({'n': n, 'method': name, 'seconds': elapsed,
+                         'fairness': float(np.nanmean(metrics['fairness'])),
+                         'dominant_fairness': float(np.nanmean(metrics['dominant_fairness'])),
+                         'makespan': float(np.nanmean(metrics['makespan'])),
+                         'utility': float(np.nanmean(metrics['utility']))})
+    return rows
+
+def plot_sweep(rows, filename):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    panels = [('fairness', "Jain nadwyżki (średnio po wymiarach)"), ('dominant_fairness', 'Jain udziałów dominujących'),
+              ('makespan', 'Makespan (wąskie gardło)'), ('utility', 'Suma Logarytmów Nadwyżki')]
+    fig, axes = plt.subplots(1, 4, figsize=(22, 5))
+    for style, name in zip(('o-', 's-.', 'X--'), METHODS):
+        pts = [r for r in rows if r['method'] == name]
+        for ax, (key, title) in zip(axes, panels):
+            ax.plot([r['n'] for r in pts], [r[key] for r in pts], style, label=name)
+            ax.set_title(title); ax.set_xlabel('N_Users')
+    axes[0].legend()
+    plt.tight_layout()
+    print(f"Zapisywanie: {filename}")
+    plt.savefig(filename, dpi=150)
+    plt.close(fig)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--multiplier', type=float, default=1.5)
+    parser.add_argument('--min_req', type=float, default=1.0)
+    parser.add_argument('--max_req', type=float, default=100.0)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--step', type=int, default=100)
+    parser.add_argument('--iter', type=int, default=20)
+    parser.add_argument('--dims', type=int, default=3)  # np. CPU, pamięć, sieć
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--no-plot', action='store_true')
+    args = parser.parse_args()
+
+    rows = run_sweep(args.users, args.step, args.iter, args.dims, args.multiplier,
+                     args.min_req, args.max_req, args.seed)
+    print(f"{'n':>6} {'metoda':>13} {'czas [ms]':>10} {'Jain':>7} {'Jain dom.':>9} {'makespan':>9} {'utility':>10}")
+    for r in rows:
+        print(f"{r['n']:>6} {r['method']:>13} {r['seconds'] * 1e3:10.3f} {r['fairness']:7.4f} "
+              f"{r['dominant_fairness']:9.4f} {r['makespan']:9.4f} {r['utility']:10.2f}")
+    if not args.no_plot:
+        os.makedirs('results', exist_ok=True)
+        plot_sweep(rows, os.path.join('results', f"multi_M{args.multiplier}_R{int(args.min_req)}-"
+                                                 f"{int(args.max_req)}_D{args.dims}.png"))
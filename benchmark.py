@@ -0,0 +1,193 @@
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+import cvxpy as cp
+import numpy as np
+
+from algorytm1 import WeiCloudProject, parse_shape
+from algorytm_global_2 import CloudAllocator, CompiledNBSProblem
+
+# --- BENCHMARK SOLVERÓW I SYMULACJI ---
+# Mierzy czas (zimne pierwsze wywołanie + min/mediana z powtórzeń), szczytową
+# pamięć (tracemalloc, osobny przebieg - śledzenie spowalnia pomiar czasu) oraz
+# jakość rozwiązania względem referencji. Referencją dla NBS jest natywny
+# water-filling (dokładne rozwiązanie KKT). Uwaga: tracemalloc widzi tylko
+# alokacje Pythona/NumPy, nie pamięć wewnątrz solverów C (ECOS, SCS).
+
+def nbs_objective(x, min_reqs, weights):
+    surplus = x - min_reqs
+    if np.any(surplus <= 0): return -np.inf
+    return float(np.sum(weights * np.log(surplus)))
+
+def violation(x, min_reqs, capacity):
+    # najgorsze naruszenie: przekroczenie pojemności lub minimum użytkownika
+    return float(max(0.0, np.sum(x) - capacity, np.max(min_reqs - x)))
+
+def measure(fn, repeats, inputs=None):
+    # inputs: osobne argumenty fn dla każdego wywołania (zimne, powtórzenia,
+    # tracemalloc) - solver z ciepłym startem nie rozwiązuje wtedy wciąż tego samego
+    if repeats < 1: raise ValueError("repeats musi być >= 1")
+    inputs = inputs or [()] * (repeats + 2)
+    if len(inputs) < repeats + 2: raise ValueError(f"potrzeba {repeats + 2} zestawów wejścia")
+    start = time.perf_counter()
+    out = fn(*inputs[0])
+    cold = time.perf_counter() - start
+    times = []
+    for args in inputs[1:repeats + 1]:
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn(*inputs[repeats + 1])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, {'cold_s': cold, 'min_s': min(times), 'median_s': float(np.median(times)),
+                 'peak_bytes': peak}
+
+# --- BACKENDY NBS ---
+def cvxpy_backend(solver):
+    # wymuszony solver zamiast łańcucha ECOS -> SCS w CompiledNBSProblem. Problem
+    # budowany raz na n w prepare() i używany ponownie, jak w ścieżce z cache
+    # solve_wei_nbs(backend='cvxpy'): kanonikalizacja DPP trafia do cold_s,
+    # a min/mediana mierzą samo rozwiązanie
+    compiled = {}
+
+    def prepare(n):
+        if solver not in cp.installed_solvers(): raise RuntimeError(f"solver {solver} nie jest zainstalowany")
+        if n not in compiled:
+            problem = compiled[n] = CompiledNBSProblem(n)
+            problem.SOLVERS = (solver,)
+
+    def solve(allocator, reqs, w):
+        x = compiled[len(reqs)].solve(reqs, allocator.capacity, w)
+        return None if x is None else np.maximum(x, reqs)
+    solve.prepare = prepare
+    return solve
+
+BACKENDS = {
+    'native': lambda allocator, reqs, w: allocator.solve_wei_nbs(reqs, w),
+    'cvxpy-ECOS': cvxpy_backend(cp.ECOS),
+    'cvxpy-SCS': cvxpy_backend(cp.SCS),
+    'slsqp': lambda allocator, reqs, w: allocator._solve_wei_nbs_slsqp(reqs, w),
+    'proportional': lambda allocator, reqs, w: allocator.solve_proportional_surplus(reqs),
+}
+
+def random_nbs_instance(n, rng):
+    # wagi nierówne: przy w = 1 punkt startowy SLSQP (m + S/n) jest już optimum
+    reqs = rng.uniform(1.0, 100.0, n)
+    return CloudAllocator(np.sum(reqs) * 1.5), reqs, rng.uniform(0.5, 2.0, n)
+
+def bench_solvers(sizes, backends, repeats, max_slsqp, rng):
+    rows = []
+    for n in sizes:
+        # nowa instancja na każde wywołanie; jakość liczona na pierwszej
+        instances = [random_nbs_instance(n, rng) for _ in range(repeats + 2)]
+        allocator, reqs, w = instances[0]
+        ref = allocator.solve_wei_nbs(reqs, w)
+        ref_obj = nbs_objective(ref, reqs, w)
+        for name in backends:
+            if name == 'slsqp' and n > max_slsqp: continue
+            row = {'backend': name, 'n': n}
+            try:
+                prepare = getattr(BACKENDS[name], 'prepare', None)
+                if prepare:
+                    start = time.perf_counter()
+                    prepare(n)
+                    row['compile_s'] = time.perf_counter() - start
+                x, stats = measure(BACKENDS[name], repeats, instances)
+            except Exception as e:
+                row['error'] = f"{type(e).__name__}: {e}"
+                rows.append(row)
+                print(f"  {name:>14} n={n:<6} niedostępny ({row['error'][:60]})")
+                continue
+            row.update(stats)
+            if x is None:
+                row['error'] = 'brak rozwiązania'
+            else:
+                obj = nbs_objective(x, reqs, w)
+                row['objective_gap'] = (ref_obj - obj) / max(1.0, abs(ref_obj))
+                row['max_violation'] = violation(x, reqs, allocator.capacity)
+            rows.append(row)
+            print(f"  {name:>14} n={n:<6} {row['min_s'] * 1e3:9.3f} ms  "
+                  f"gap={row.get('objective_gap', float('nan')):.2e}")
+    return rows
+
+# --- KROK 1 / KROK 2 (Wei et al.) ---
+def bench_pipeline(shapes, repeats, max_iterations, sparse, rng):
+    rows = []
+    for tasks, resources in shapes:
+        project = WeiCloudProject.random_instance(tasks, resources, rng)
+        row = {'tasks': tasks, 'resources': resources, 'sparse': sparse}
+        initial, row['step1'] = measure(lambda: project.step1_independent_optimization(sparse=sparse), repeats)
+        final, row['step2'] = measure(
+            lambda: project.step2_evolutionary_optimization(initial, max_iterations), repeats)
+        dense_initial = initial.to_dense() if sparse else initial
+        dense_final = final.to_dense() if sparse else final
+        # jakość kroku 2 względem punktu startowego z kroku 1
+        row['utility_step1'] = float(project.get_total_system_utility(dense_initial))
+        row['utility_step2'] = float(project.get_total_system_utility(dense_final))
+        row['step2_stats'] = dict(project.step2_stats)
+        rows.append(row)
+        print(f"  {tasks:>5}x{resources:<5} krok1 {row['step1']['min_s'] * 1e3:9.3f} ms  "
+              f"krok2 {row['step2']['min_s'] * 1e3:9.3f} ms  "
+              f"U: {row['utility_step1']:.3f} -> {row['utility_step2']:.3f}")
+    return rows
+
+# --- WYKRES SKALOWANIA ---
+def plot_scaling(report, filename):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(1, 2, figsize=(14, 5))
+    for name in report['config']['backends']:
+        pts = [r for r in report['solvers'] if r['backend'] == name and 'min_s' in r]
+        if pts: axes[0].loglog([r['n'] for r in pts], [r['min_s'] for r in pts], 'o-', label=name)
+    axes[0].set_title('NBS: czas rozwiązania vs liczba użytkowników')
+    axes[0].set_xlabel('n'); axes[0].set_ylabel('czas [s]')
+    axes[0].grid(True, which='both', alpha=0.3); axes[0].legend()
+
+    sizes = [r['tasks'] * r['resources'] for r in report['pipeline']]
+    for phase in ('step1', 'step2'):
+        axes[1].loglog(sizes, [r[phase]['min_s'] for r in report['pipeline']], 'o-', label=phase)
+    axes[1].set_title('Wei et al.: czas kroku 1 i 2')
+    axes[1].set_xlabel('zadania x zasoby'); axes[1].set_ylabel('czas [s]')
+    axes[1].grid(True, which='both', alpha=0.3); axes[1].legend()
+
+    plt.tight_layout()
+    plt.savefig(filename)
+    plt.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 30, 100, 300, 1000])
+    parser.add_argument('--backends', nargs='+', choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument('--max-slsqp', type=int, default=300)
+    parser.add_argument('--shapes', type=parse_shape, nargs='+',
+                        default=[(20, 5), (100, 10), (300, 30), (1000, 50)])
+    parser.add_argument('--max-iterations', type=int, default=20)
+    parser.add_argument('--sparse', action='store_true')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=os.path.join('results', 'benchmark'))
+    args = parser.parse_args()
+    if args.repeats < 1: parser.error("--repeats musi być >= 1")
+
+    rng = np.random.default_rng(args.seed)
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    report = {'config': {k: v for k, v in vars(args).items() if k != 'out'},
+              'platform': {'python': platform.python_version(), 'numpy': np.__version__,
+                           'cvxpy': cp.__version__, 'machine': platform.machine()}}
+    print("Solvery NBS:")
+    report['solvers'] = bench_solvers(args.sizes, args.backends, args.repeats, args.max_slsqp, rng)
+    print("Krok 1 / krok 2:")
+    report['pipeline'] = bench_pipeline(args.shapes, args.repeats, args.max_iterations, args.sparse, rng)
+
+    with open(args.out + '.json', 'w') as f:
+        json.dump(report, f, indent=2)
+    plot_scaling(report, args.out + '_scaling.png')
+    print(f"Zapisano: {args.out}.json, {args.out}_scaling.png")
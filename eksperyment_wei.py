@@ -0,0 +1,136 @@
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from algorytm1 import WeiCloudProject, parse_shape
+
+# --- EKSPERYMENT SKALOWANIA (Wei et al.) ---
+# Losowe instancje (zadania x zasoby) przez krok 1 i krok 2 w puli procesów.
+# Każda instancja ma własny generator z SeedSequence(seed, spawn_key=(T, R, it)),
+# więc wynik nie zależy od liczby procesów ani kolejności wykonania.
+COLUMNS = ('tasks', 'resources', 'iteration', 'step1_s', 'step2_s', 'iterations', 'reallocations',
+           'utility_step1', 'utility_final', 'converged')
+
+def instance_rng(entropy, tasks, resources, iteration):
+    return np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(tasks, resources, iteration)))
+
+# Uruchamiane w procesie roboczym puli - jedna instancja, jeden wiersz wyników
+def _run_instance(task):
+    entropy, tasks, resources, iteration, max_iterations = task
+    project = WeiCloudProject.random_instance(tasks, resources, instance_rng(entropy, tasks, resources, iteration))
+    start = time.perf_counter()
+    initial = project.step1_independent_optimization(sparse=True)
+    step1 = time.perf_counter() - start
+    start = time.perf_counter()
+    final = project.step2_evolutionary_optimization(initial, max_iterations)
+    step2 = time.perf_counter() - start
+    stats = project.step2_stats
+    return (tasks, resources, iteration, step1, step2, stats['iterations'], stats['reallocations'],
+            project.get_total_system_utility(initial), project.get_total_system_utility(final),
+            stats['converged'])
+
+class WeiScalingExperiment:
+    def __init__(self, max_iterations=20, seed=None):
+        # max_iterations=None -> krok 2 aż do równowagi
+        self.max_iterations = max_iterations
+        # seed=None -> losowa entropia (do odtworzenia przebiegu przez --seed)
+        self.seed = np.random.SeedSequence(seed).entropy
+        self.rows = []
+
+    def run(self, shapes, iterations, workers=1):
+        print(f"Start: {len(shapes)} rozmiarów x {iterations} instancji, limit={self.max_iterations}, Seed={self.seed}")
+        # największe instancje pierwsze - mniej bezczynnych procesów na końcu
+        tasks = [(self.seed, t, r, it, self.max_iterations)
+                 for t, r in sorted(shapes, key=lambda s: -s[0] * s[1]) for it in range(iterations)]
+        if workers <= 1:
+            self.rows.extend(map(_run_instance, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                self.rows.extend(pool.map(_run_instance, tasks))
+        self.rows.sort(key=lambda row: row[:3])
+
+    def summary(self):
+        # (T, R) -> średnie i udział instancji, które trafiły w limit iteracji
+        out = {}
+        if not self.rows: return out
+        data = np.array([row[:-1] for row in self.rows], dtype=float)
+        converged = np.array([row[-1] for row in self.rows])
+        for t, r in sorted({row[:2] for row in self.rows}):
+            sel = (data[:, 0] == t) & (data[:, 1] == r)
+            d = data[sel]
+            out[(t, r)] = {'instances': int(sel.sum()), 'step1_s': d[:, 3].mean(), 'step2_s': d[:, 4].mean(),
+                           'step2_max_s': d[:, 4].max(), 'reallocations': d[:, 6].mean(),
+                           'utility_gain': (d[:, 8] - d[:, 7]).mean(), 'cap_hit': 1.0 - converged[sel].mean()}
+        return out
+
+    def print_summary(self):
+        print(f"{'T x R':>12} {'krok1 [ms]':>11} {'krok2 [ms]':>11} {'maks.':>9} {'realok.':>8} "
+              f"{'zysk U':>8} {'limit':>6}")
+        for (t, r), s in self.summary().items():
+            print(f"{f'{t}x{r}':>12} {s['step1_s'] * 1e3:11.2f} {s['step2_s'] * 1e3:11.2f} "
+                  f"{s['step2_max_s'] * 1e3:9.1f} {s['reallocations']:8.1f} {s['utility_gain']:8.4f} "
+                  f"{s['cap_hit']:6.0%}")
+
+    def save_csv(self, path):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            writer.writerows(self.rows)
+
+    def plot(self, filename):
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
+        summary = self.summary()
+        sizes = np.array([t * r for t, r in summary])
+        order = np.argsort(sizes)
+        rows = [list(summary.values())[k] for k in order]
+        sizes = sizes[order]
+        fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+        axes[0].loglog(sizes, [s['step1_s'] for s in rows], 'o-', label='krok 1')
+        axes[0].loglog(sizes, [s['step2_s'] for s in rows], 's-', label='krok 2 (średnio)')
+        axes[0].loglog(sizes, [s['step2_max_s'] for s in rows], 's--', label='krok 2 (maks.)')
+        axes[0].set_title('Czas wykonania'); axes[0].set_ylabel('czas [s]'); axes[0].legend()
+        axes[1].semilogx(sizes, [s['reallocations'] for s in rows], 'o-')
+        axes[1].set_title('Liczba realokacji (krok 2)')
+        axes[2].semilogx(sizes, [s['cap_hit'] for s in rows], 'o-', color='tab:red')
+        axes[2].set_title('Udział instancji z przekroczonym limitem iteracji'); axes[2].set_ylim(-0.05, 1.05)
+        for ax in axes:
+            ax.set_xlabel('zadania x zasoby'); ax.grid(True, which='both', alpha=0.3)
+        plt.tight_layout()
+        print(f"Zapisywanie: {filename}")
+        plt.savefig(filename, dpi=150)
+        plt.close(fig)
+
+def parse_limit(text):
+    # limit iteracji kroku 2 jak w step2_evolutionary_optimization: 0 -> sam krok 1,
+    # 'none' -> aż do równowagi
+    return None if text.lower() in ('none', 'inf') else int(text)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--shapes', type=parse_shape, nargs='+',
+                        default=[(20, 5), (50, 10), (100, 20), (200, 20), (500, 50)])
+    parser.add_argument('--iter', type=int, default=10)
+    parser.add_argument('--max-iterations', type=parse_limit, default=20)  # none -> aż do równowagi
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--no-plot', action='store_true')
+    args = parser.parse_args()
+
+    if args.max_iterations is not None and args.max_iterations < 0: parser.error("--max-iterations musi być >= 0 albo none")
+    exp = WeiScalingExperiment(args.max_iterations, args.seed)
+    start = time.perf_counter()
+    exp.run(args.shapes, args.iter, args.workers)
+    print(f"Czas całkowity: {time.perf_counter() - start:.2f} s")
+    exp.print_summary()
+
+    os.makedirs('results', exist_ok=True)
+    tag = f"wei_scaling_L{'inf' if args.max_iterations is None else args.max_iterations}"
+    exp.save_csv(os.path.join('results', tag + '.csv'))
+    if not args.no_plot: exp.plot(os.path.join('results', tag + '.png'))
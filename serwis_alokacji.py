@@ -0,0 +1,412 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from algorytm1 import WeiCloudProject
+from algorytm_global_2 import CloudAllocator
+from telemetria import Telemetry
+
+# --- SERWIS ALOKACJI (asyncio, JSON lines) ---
+# Jedno żądanie = jedna linia JSON, jedna odpowiedź = jedna linia JSON z tym samym "id"
+# (odpowiedzi mogą przyjść w innej kolejności niż żądania). Metody:
+#   {"id": 1, "method": "nbs", "min_reqs": [...], "capacity": C, "weights": [...], "max_caps": [...]}
+#   {"id": 2, "method": "proportional", "min_reqs": [...], "capacity": C}
+#   {"id": 3, "method": "wei", "prices": [...], "exec_times": [[...]], "subtasks": [...],
+#    "wt": 0.5, "we": 0.5, "max_iterations": 20}
+#   {"id": 4, "method": "stats"}  - percentyle opóźnień, przepustowość, rozmiary paczek
+# Mikro-paczkowanie: żądania, które przyjdą w oknie `window` od pierwszego, grupowane
+# są po (metoda, n, obecność wag/limitów) i rozwiązywane jednym wywołaniem
+# wsadowym CloudAllocator (wiersz = żądanie, pojemność per wiersz). Instancje Wei
+# nie mają ścieżki wsadowej - cała grupa idzie jednym zadaniem do puli wątków.
+STREAM_LIMIT = 1 << 24  # maks. długość linii - duże instancje Wei to megabajty JSON-a
+
+def parse_request(req):
+    # -> (klucz grupy, dane); błędy formatu zgłaszane od razu, bez czekania na paczkę
+    method = req.get('method', 'nbs')
+    if method == 'wei':
+        return ('wei',), parse_wei(req)
+    if method not in ('nbs', 'proportional'): raise ValueError(f"nieznana metoda: {method}")
+    m = finite('min_reqs', req['min_reqs'])
+    if m.ndim != 1 or len(m) == 0: raise ValueError("min_reqs: oczekiwany niepusty wektor")
+    payload = {'min_reqs': m, 'capacity': float(finite('capacity', req['capacity']))}
+    if method == 'nbs':
+        for name in ('weights', 'max_caps'):
+            if req.get(name) is None: continue
+            v = finite(name, req[name])
+            if v.shape != m.shape: raise ValueError(f"{name}: oczekiwana długość {len(m)}")
+            # zła waga wykryta dopiero w paczce wywróciłaby całą grupę żądań
+            if name == 'weights' and np.any(v < 0): raise ValueError("weights: oczekiwane wartości >= 0")
+            payload[name] = v
+    return (method, len(m), 'weights' in payload, 'max_caps' in payload), payload
+
+def finite(name, value):
+    # Infinity/NaN (albo 1e400) dałyby w odpowiedzi liczby spoza JSON-a
+    v = np.asarray(value, dtype=float)
+    if not np.all(np.isfinite(v)): raise ValueError(f"{name}: oczekiwane skończone liczby")
+    return v
+
+def parse_wei(req):
+    # kształty wymagane przez WeiCloudProject: ceny (R), czasy (T x R), podzadania (T)
+    prices = finite('prices', req['prices'])
+    exec_times = finite('exec_times', req['exec_times'])
+    subtasks = np.asarray(req['subtasks'])
+    if prices.ndim != 1 or len(prices) == 0: raise ValueError("prices: oczekiwany niepusty wektor")
+    if subtasks.ndim != 1 or len(subtasks) == 0: raise ValueError("subtasks: oczekiwany niepusty wektor")
+    if not np.issubdtype(subtasks.dtype, np.integer) or np.any(subtasks < 1):
+        raise ValueError("subtasks: oczekiwane liczby całkowite >= 1")
+    if exec_times.shape != (len(subtasks), len(prices)):
+        raise ValueError(f"exec_times: oczekiwany kształt ({len(subtasks)}, {len(prices)})")
+    max_iterations = req.get('max_iterations', 20)
+    if max_iterations is not None and (not isinstance(max_iterations, int) or max_iterations < 0):
+        raise ValueError("max_iterations: oczekiwana liczba całkowita >= 0 albo null")
+    wt, we = (float(finite(name, req.get(name, 0.5))) for name in ('wt', 'we'))
+    return {'prices': prices, 'exec_times': exec_times, 'subtasks': subtasks, 'wt': wt, 'we': we,
+            'max_iterations': max_iterations}
+
+def infeasible_reason(payload):
+    if payload['min_reqs'].sum() > payload['capacity']: return "niewykonalne: sum(min_reqs) > capacity"
+    if 'max_caps' in payload and np.any(payload['max_caps'] < payload['min_reqs']):
+        return "niewykonalne: max_caps < min_reqs"
+    return "brak rozwiązania"
+
+def solve_group(key, payloads, digits=None):
+    # wykonywane w wątku puli; wynik (słownik albo wyjątek) na każde żądanie grupy
+    if key[0] == 'wei':
+        return [_try(solve_wei, p) for p in payloads]
+    m = np.stack([p['min_reqs'] for p in payloads])
+    allocator = CloudAllocator(np.array([p['capacity'] for p in payloads]))
+    if key[0] == 'proportional':
+        out = allocator.solve_proportional_surplus_batch(m)
+    else:
+        w = np.stack([p['weights'] for p in payloads]) if key[2] else None
+        u = np.stack([p['max_caps'] for p in payloads]) if key[3] else None
+        out = allocator.solve_wei_nbs_batch(m, w, u)
+    # formatowanie floatów dominuje koszt odpowiedzi - krótsze liczby kodują się ~2x szybciej
+    if digits is not None: out = np.round(out, digits)
+    # wiersz NaN = instancja niewykonalna - przyczyna ustalana z danych żądania
+    return [ValueError(infeasible_reason(p)) if np.isnan(row[0]) else {'allocation': row.tolist()}
+            for p, row in zip(payloads, out)]
+
+def solve_wei(req):
+    project = WeiCloudProject(req['prices'], req['exec_times'], req['subtasks'], req['wt'], req['we'], verbose=False)
+    initial = project.step1_independent_optimization(sparse=True)
+    final = project.step2_evolutionary_optimization(initial, req['max_iterations'])
+    stats = project.step2_stats
+    return {'allocation': final.to_dense().tolist(), 'utility': project.get_total_system_utility(final),
+            'iterations': int(stats['iterations']), 'converged': bool(stats['converged'])}
+
+def _try(func, arg):
+    try: return func(arg)
+    except Exception as e: return e
+
+def latency_percentiles(values, quantiles=(50, 90, 99, 99.9)):
+    if len(values) == 0: return {}
+    points = np.percentile(np.fromiter(values, dtype=float, count=len(values)), quantiles)
+    return {f"p{q:g}": float(v) * 1e3 for q, v in zip(quantiles, points)}
+
+# --- STATYSTYKI SERWISU ---
+# Percentyle z ostatnich `window` opóźnień (od odebrania linii do zapisu odpowiedzi);
+# histogram i liczniki błędów per metoda w Telemetry jak w symulatorze.
+class ServiceStats:
+    def __init__(self, window=100000):
+        self.start = time.perf_counter()
+        self.latencies = deque(maxlen=window)
+        self.requests = self.errors = 0
+        self.batches = self.batched = self.max_batch = 0
+        self.telemetry = Telemetry()
+
+    def record(self, method, seconds, kind=None):
+        # kind: klasa błędu (KeyError, ValueError, ...) - treść komunikatu pochodzi
+        # od klienta i tylko trafia do odpowiedzi, inaczej liczba kluczy rośnie bez końca
+        self.requests += 1
+        if kind: self.errors += 1
+        self.latencies.append(seconds)
+        self.telemetry.record_call('serwis-' + method, seconds, kind is None, kind)
+
+    def record_batch(self, size):
+        self.batches += 1
+        self.batched += size
+        self.max_batch = max(self.max_batch, size)
+
+    def snapshot(self):
+        uptime = time.perf_counter() - self.start
+        return {'requests': self.requests, 'errors': self.errors, 'uptime_s': uptime,
+                'throughput_rps': self.requests / max(uptime, 1e-12),
+                'latency_ms': latency_percentiles(self.latencies),
+                'batches': {'count': self.batches, 'mean_size': self.batched / max(self.batches, 1),
+                            'max_size': self.max_batch},
+                'telemetry': self.telemetry.to_dict()}
+
+# --- MIKRO-PACZKOWANIE ---
+class MicroBatcher:
+    def __init__(self, window, max_batch, executor, stats, digits=None):
+        self.window = window
+        self.digits = digits
+        self.max_batch = max_batch
+        self.executor = executor
+        self.stats = stats
+        self.queue = asyncio.Queue()
+        self.running = set()  # referencje do zadań rozwiązywania (inaczej GC może je przerwać)
+
+    async def submit(self, key, payload):
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((key, payload, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            # pełna paczka już w kolejce -> bez czekania na okno
+            if self.window > 0 and self.queue.qsize() < self.max_batch - 1: await asyncio.sleep(self.window)
+            while len(batch) < self.max_batch and not self.queue.empty(): batch.append(self.queue.get_nowait())
+            groups = {}
+            for key, payload, future in batch: groups.setdefault(key, []).append((payload, future))
+            self.stats.record_batch(len(batch))
+            for key, items in groups.items():
+                task = loop.create_task(self._solve(key, items))
+                self.running.add(task)
+                task.add_done_callback(self.running.discard)
+
+    async def _solve(self, key, items):
+        start = time.perf_counter()
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.executor, solve_group, key, [p for p, _ in items], self.digits)
+        except Exception as e:
+            results = [e] * len(items)
+        self.stats.telemetry.add_phase('solve-' + key[0], time.perf_counter() - start)
+        for (_, future), result in zip(items, results):
+            if future.done(): continue  # klient się rozłączył
+            if isinstance(result, Exception): future.set_exception(result)
+            else: future.set_result(result)
+
+class AllocationService:
+    def __init__(self, window=0.002, max_batch=256, workers=1, digits=None):
+        self.stats = ServiceStats()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.batcher = MicroBatcher(window, max_batch, self.executor, self.stats, digits)
+
+    async def handle(self, reader, writer):
+        tasks = set()
+        lock = asyncio.Lock()
+        # odpowiedzi z jednej paczki kończą się w tym samym kroku pętli - zbieramy je
+        # i wysyłamy jednym write (jedno wywołanie send zamiast jednego na żądanie)
+        loop = asyncio.get_running_loop()
+        out = []
+
+        def flush():
+            if out and not writer.is_closing(): writer.write(b''.join(out))
+            out.clear()
+
+        def send(data):
+            if not out: loop.call_soon(flush)
+            out.append(data)
+
+        try:
+            while line := await reader.readline():
+                task = asyncio.ensure_future(self.respond(line, send, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, ValueError):
+            pass  # zerwane połączenie albo linia dłuższa niż STREAM_LIMIT
+        finally:
+            if tasks: await asyncio.gather(*tasks, return_exceptions=True)
+            flush()
+            writer.close()
+
+    async def respond(self, line, send, writer, lock):
+        start = time.perf_counter()
+        rid, method, error, kind = None, 'invalid', None, None
+        try:
+            req = json.loads(line)
+            if not isinstance(req, dict): raise ValueError("oczekiwany obiekt JSON")
+            rid = req.get('id')
+            # nieznane metody liczone razem - klient nie tworzy nowych kluczy telemetrii
+            method = req.get('method', 'nbs')
+            if method not in ('nbs', 'proportional', 'wei', 'stats'): method = 'invalid'
+            if method == 'stats':
+                response = self.stats.snapshot()
+            else:
+                response = await self.batcher.submit(*parse_request(req))
+        except KeyError as e:
+            error, kind = f"brak pola {e}", type(e).__name__
+        except (TypeError, ValueError) as e:
+            error, kind = str(e), type(e).__name__
+        except Exception as e:
+            # każde żądanie dostaje odpowiedź - inaczej klient czeka w nieskończoność
+            error, kind = f"{type(e).__name__}: {e}", type(e).__name__
+        if error: response = {'error': error}
+        try:
+            data = json.dumps({'id': rid, **response}, allow_nan=False)
+        except ValueError:
+            # NaN/Infinity w wyniku (albo w id) - standardowy JSON ich nie ma
+            error, kind = "wynik zawiera NaN/Infinity", 'ValueError'
+            data = json.dumps({'id': rid if isinstance(rid, (str, int)) else None, 'error': error})
+        send((data + '\n').encode())
+        self.stats.record(method, time.perf_counter() - start, kind)
+        # drain naraz tylko z jednego zadania połączenia
+        async with lock:
+            try: await writer.drain()
+            except ConnectionError: pass
+
+    async def serve(self, host, port, unix=None, report=0.0):
+        if unix:
+            server = await asyncio.start_unix_server(self.handle, unix, limit=STREAM_LIMIT)
+            print(f"Serwis alokacji: unix:{unix}")
+        else:
+            server = await asyncio.start_server(self.handle, host, port, limit=STREAM_LIMIT)
+            print(f"Serwis alokacji: {host}:{port}")
+        # SIGINT/SIGTERM (docker stop) kończą serwis czysto - telemetria zostaje zapisana
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM): loop.add_signal_handler(sig, asyncio.current_task().cancel)
+        batcher = asyncio.ensure_future(self.batcher.run())
+        reporter = asyncio.ensure_future(self._report(report)) if report > 0 else None
+        try:
+            async with server: await server.serve_forever()
+        finally:
+            batcher.cancel()
+            if reporter: reporter.cancel()
+            self.executor.shutdown(wait=False)
+
+    async def _report(self, every):
+        last = 0
+        while True:
+            await asyncio.sleep(every)
+            s = self.stats.snapshot()
+            # przepustowość z ostatniego okresu, nie średnia od startu
+            rate, last = (s['requests'] - last) / every, s['requests']
+            lat = ' '.join(f"{k}={v:.2f}" for k, v in s['latency_ms'].items())
+            print(f"[{s['uptime_s']:8.1f} s] żądań {s['requests']}, {rate:.0f}/s, "
+                  f"paczka śr. {s['batches']['mean_size']:.1f}, opóźnienie [ms] {lat}")
+
+# --- GENERATOR OBCIĄŻENIA ---
+# Pętla zamknięta: `clients` połączeń, na każdym `depth` żądań w locie; każde
+# kończące się żądanie od razu wysyła następne. Treść żądań losowana z góry
+# (pula `pool`), żeby koszt JSON-a po stronie klienta nie zaniżał wyników.
+def request_pool(method, n, count, multiplier, req_min, req_max, rng, resources=20):
+    bodies = []
+    for _ in range(count):
+        if method == 'wei':
+            project = WeiCloudProject.random_instance(n, resources, rng)
+            req = {'method': 'wei', 'prices': project.PRICES.tolist(), 'exec_times': project.EXEC_TIMES.tolist(),
+                   'subtasks': project.SUBTASKS_COUNT.tolist()}
+        else:
+            # pojemność jak w SimulationExperiment: multiplier * n * średnie wymaganie
+            req = {'method': method, 'min_reqs': rng.uniform(req_min, req_max, n).round(6).tolist(),
+                   'capacity': multiplier * n * (req_min + req_max) / 2}
+        bodies.append(json.dumps(req)[1:])  # bez '{' - id doklejane przy wysyłce
+    return bodies
+
+class LoadClient:
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+        self.pending = {}
+        self.next_id = 0
+        self.receiver = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def connect(cls, host, port, unix=None):
+        if unix: streams = await asyncio.open_unix_connection(unix, limit=STREAM_LIMIT)
+        else: streams = await asyncio.open_connection(host, port, limit=STREAM_LIMIT)
+        return cls(*streams)
+
+    async def _receive(self):
+        # serwer zaczyna odpowiedź od '{"id": N, ' - wystarczy odczytać id, a linię oddać
+        # w surowej postaci; pełne dekodowanie długich wektorów zaniżałoby przepustowość
+        while line := await self.reader.readline():
+            future = self.pending.pop(int(line[7:line.index(b',')]), None)
+            if future: future.set_result(line)
+
+    async def call(self, body):
+        # -> surowa linia odpowiedzi
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.pending[self.next_id] = future
+        self.writer.write(f'{{"id": {self.next_id}, {body}\n'.encode())
+        await self.writer.drain()
+        return await future
+
+    async def close(self):
+        self.receiver.cancel()
+        self.writer.close()
+
+async def run_load(args):
+    rng = np.random.default_rng(args.seed)
+    bodies = request_pool(args.method, args.n, args.pool, args.multiplier, args.min_req, args.max_req, rng)
+    clients = [await LoadClient.connect(args.host, args.port, args.unix) for _ in range(args.clients)]
+    latencies, errors = [], 0
+    remaining = args.requests
+
+    async def loop(client, k):
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            line = await client.call(bodies[(remaining + k) % len(bodies)])
+            latencies.append(time.perf_counter() - start)
+            if line.startswith(b'"error"', line.index(b',') + 2): errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(loop(c, k) for c in clients for k in range(args.depth)))
+    wall = time.perf_counter() - start
+    server = json.loads(await clients[0].call(json.dumps({'method': 'stats'})[1:]))
+    for c in clients: await c.close()
+    return {'requests': len(latencies), 'errors': errors, 'seconds': wall,
+            'throughput_rps': len(latencies) / max(wall, 1e-12),
+            'latency_ms': latency_percentiles(latencies), 'server': server}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name in ('serve', 'bench'):
+        p = sub.add_parser(name)
+        p.add_argument('--host', default='127.0.0.1')
+        p.add_argument('--port', type=int, default=8765)
+        p.add_argument('--unix', default=None)  # ścieżka gniazda Unix zamiast TCP
+    serve = sub.choices['serve']
+    serve.add_argument('--window', type=float, default=0.002)  # okno mikro-paczki [s]; 0 -> bez czekania
+    serve.add_argument('--max-batch', type=int, default=256)   # 1 -> bez paczkowania
+    serve.add_argument('--workers', type=int, default=1)       # wątki rozwiązujące paczki
+    serve.add_argument('--report', type=float, default=0.0)    # co ile sekund wypisywać statystyki
+    serve.add_argument('--digits', type=int, default=None)     # zaokrąglenie przydziałów w odpowiedziach
+    bench = sub.choices['bench']
+    bench.add_argument('--method', choices=('nbs', 'proportional', 'wei'), default='nbs')
+    bench.add_argument('--n', type=int, default=100)            # użytkownicy (dla wei: zadania)
+    bench.add_argument('--requests', type=int, default=20000)
+    bench.add_argument('--clients', type=int, default=8)
+    bench.add_argument('--depth', type=int, default=4)          # żądania w locie na połączenie
+    bench.add_argument('--pool', type=int, default=64)          # liczba różnych wylosowanych instancji
+    bench.add_argument('--multiplier', type=float, default=1.5)
+    bench.add_argument('--min_req', type=float, default=1.0)
+    bench.add_argument('--max_req', type=float, default=100.0)
+    bench.add_argument('--seed', type=int, default=None)
+    bench.add_argument('--out', default=None)                   # zapis wyniku (JSON)
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        service = AllocationService(args.window, args.max_batch, args.workers, args.digits)
+        try:
+            asyncio.run(service.serve(args.host, args.port, args.unix, args.report))
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            pass
+        finally:
+            print(service.stats.telemetry.summary())
+            service.stats.telemetry.save(os.path.join('results', 'serwis_telemetry.json'))
+    else:
+        result = asyncio.run(run_load(args))
+        print(f"Żądań: {result['requests']} ({result['errors']} błędów) w {result['seconds']:.2f} s, "
+              f"{result['throughput_rps']:,.0f} żądań/s")
+        print("Opóźnienie klienta [ms]: " + ' '.join(f"{k}={v:.3f}" for k, v in result['latency_ms'].items()))
+        server = result['server']
+        print(f"Serwer: paczek {server['batches']['count']}, śr. rozmiar {server['batches']['mean_size']:.1f}, "
+              f"maks. {server['batches']['max_size']}")
+        if args.out:
+            with open(args.out, 'w') as f: json.dump(result, f, indent=2)
@@ -0,0 +1,141 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib.pyplot as plt
+
+from algorytm_global_2 import SOLVER_BACKENDS, SimulationExperiment, _run_block
+from telemetria import Telemetry
+from wyniki import ResultCache, ResultsStore, StreamingStats
+
+# --- SIATKA SCENARIUSZY ---
+# Wszystkie scenariusze (multiplier x zakres żądań x liczba użytkowników) w jednym
+# procesie i jednej puli: każdy blok (scenariusz, n, iteracje) jest osobnym
+# zadaniem, a zadania startują od największych n (najdłuższe najpierw - mniej
+# bezczynnych procesów na końcu). Wyniki każdego scenariusza zbierane są
+# w kolejności planu, więc są identyczne jak przy osobnym uruchomieniu.
+
+def parse_range(text):
+    low, high = text.split('-')
+    return float(low), float(high)
+
+def load_scenarios(args):
+    defaults = {'users': args.users[0], 'iter': args.iter}
+    if args.scenarios:
+        with open(args.scenarios) as f: entries = json.load(f)
+        return [dict(defaults, **e) for e in entries]
+    return [{'multiplier': m, 'min_req': lo, 'max_req': hi, 'users': u, 'iter': args.iter}
+            for m, (lo, hi), u in itertools.product(args.multipliers, args.ranges, args.users)]
+
+NAMED_FIELDS = ('multiplier', 'min_req', 'max_req', 'users', 'iter')
+
+def scenario_names(scenarios):
+    # M i zakres zawsze w nazwie, pozostałe pola tylko gdy różnią się między
+    # scenariuszami (pola spoza NAMED_FIELDS - skrótem); katalog raw_* i pliki
+    # summary_* muszą być rozłączne, inaczej ResultsStore nadpisuje cudze porcje
+    keys = set().union(*scenarios)
+    varying = {k for k in keys if len({json.dumps(sc.get(k), sort_keys=True) for sc in scenarios}) > 1}
+    other = sorted(varying - set(NAMED_FIELDS))
+    names = []
+    for sc in scenarios:
+        name = f"M{sc['multiplier']}_R{sc['min_req']:g}-{sc['max_req']:g}"
+        if 'users' in varying: name += f"_N{sc['users']}"
+        if 'iter' in varying: name += f"_I{sc['iter']}"
+        if other:
+            extra = json.dumps({k: sc.get(k) for k in other}, sort_keys=True)
+            name += '_' + hashlib.sha1(extra.encode()).hexdigest()[:8]
+        names.append(name)
+    duplicates = [name for name, count in Counter(names).items() if count > 1]
+    if duplicates: raise SystemExit(f"Powtórzone scenariusze: {', '.join(duplicates)}")
+    return names
+
+def in_order(futures):
+    # wyniki w kolejności planu; przekazane wiersze zwalniane od razu
+    for i in range(len(futures)):
+        future, futures[i] = futures[i], None
+        yield future.result()
+
+def plot_comparison(runs, filename):
+    fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+    colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+    for k, (name, sim) in enumerate(runs):
+        color = colors[k % len(colors)]
+        for style, method in zip(('o-', 'X--'), ResultsStore.METHODS):
+            for ax, metric in zip(axes, StreamingStats.METRICS):
+                ns, mean, half = sim.stats.series(method, metric)
+                if len(ns) == 0: continue
+                ax.plot(ns, mean, style, color=color, markersize=4,
+                        label=f"{name} {'NBS' if method.startswith('Wei') else 'Prop.'}")
+                ax.fill_between(ns, mean - half, mean + half, color=color, alpha=0.15, linewidth=0)
+    titles = ["Sprawiedliwość (Jain's Index)", 'Czas Wykonania (Makespan)', 'Globalna Użyteczność (Wei et al.)']
+    for ax, metric, title in zip(axes, StreamingStats.METRICS, titles):
+        ax.set_title(title); ax.set_xlabel('N_Users'); ax.set_ylabel(metric)
+    axes[0].set_ylim(0.5, 1.05)
+    # jedna legenda dla całej figury - przy wielu scenariuszach nie zasłania wykresów
+    handles, labels = axes[0].get_legend_handles_labels()
+    fig.legend(handles, labels, loc='center right', fontsize='small')
+    plt.tight_layout(rect=(0, 0, 0.85, 1))
+    print(f"Zapisywanie: {filename}")
+    plt.savefig(filename, dpi=200)
+    plt.close(fig)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--multipliers', type=float, nargs='+', default=[1.2, 1.5, 1.8])
+    parser.add_argument('--ranges', type=parse_range, nargs='+', default=[(1.0, 100.0), (5.0, 25.0)])
+    parser.add_argument('--users', type=int, nargs='+', default=[60])
+    parser.add_argument('--iter', type=int, default=15)
+    parser.add_argument('--scenarios', default=None)  # plik JSON: lista słowników scenariuszy
+    parser.add_argument('--solver', choices=list(SOLVER_BACKENDS), default='native')
+    parser.add_argument('--batched', action='store_true')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=None)  # bez seeda cache nie ma trafień (losowe ziarno)
+    parser.add_argument('--cache', default=os.path.join('results', 'cache.sqlite'))
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--no-raw', action='store_true')
+    parser.add_argument('--overwrite-raw', action='store_true')  # usuń porcje poprzednich przebiegów
+    parser.add_argument('--out', default=os.path.join('results', 'grid_comparison.png'))
+    args = parser.parse_args()
+
+    scenarios = load_scenarios(args)
+    names = scenario_names(scenarios)
+    cache = None if args.no_cache else ResultCache(args.cache)
+    if cache and args.seed is None:
+        print("Uwaga: bez --seed każdy przebieg ma nowe ziarno - cache nie zwróci wcześniejszych wyników")
+    os.makedirs('results', exist_ok=True)
+
+    runs, jobs = [], []
+    for sc, name in zip(scenarios, names):
+        try:
+            sim = SimulationExperiment(sc['multiplier'], sc['min_req'], sc['max_req'], args.solver, args.seed,
+                                       os.path.join('results', 'raw_' + name), cache, keep_raw=not args.no_raw,
+                                       raw_mode='overwrite' if args.overwrite_raw else None)
+        except FileExistsError as e:
+            raise SystemExit(str(e))
+        print(f"Scenariusz {name}: Seed={sim.seed}")
+        points = {n: range(sc['iter']) for n in range(10, sc['users'] + 1, 10)}
+        plan, hits, todo = sim.plan_points(points, args.batched)
+        runs.append((name, sim))
+        jobs.append((sim, plan, hits, todo))
+
+    # najpierw zadania o największym koszcie (n * liczba iteracji)
+    queue = sorted(((t, j, i) for j, (_, _, _, todo) in enumerate(jobs) for i, t in enumerate(todo)),
+                   key=lambda x: -x[0][1] * len(x[0][2]))
+    print(f"Zadania: {len(queue)} w {len(scenarios)} scenariuszach, procesy: {args.workers}")
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [[None] * len(todo) for _, _, _, todo in jobs]
+        for task, j, i in queue: futures[j][i] = pool.submit(_run_block, task)
+        telemetry = Telemetry()
+        for (name, _), (sim, plan, hits, _), fs in zip(runs, jobs, futures):
+            sim._collect(plan, hits, in_order(fs))
+            sim.plot_all(name + '.png')
+            sim.stats.save_csv(os.path.join('results', 'summary_' + name + '.csv'))
+            telemetry.merge(sim.telemetry.to_dict())
+
+    plot_comparison(runs, args.out)
+    print(telemetry.summary())
+    telemetry.save(os.path.splitext(args.out)[0] + '_telemetry.json')
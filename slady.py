@@ -0,0 +1,87 @@
+import csv
+import os
+
+import numpy as np
+
+# --- ŚLADY OBCIĄŻENIA (memmap) ---
+# Wymagania zadań z prawdziwego śladu zamiast rozkładu jednostajnego. Plik .npy
+# (np.load z mmap_mode) lub surowy binarny (np.memmap o zadanym dtype) - system
+# wczytuje tylko strony dotknięte przez okno, więc ślad może być większy niż RAM.
+# Tryby okien dla (n, iteracja):
+#   consecutive - n kolejnych zadań od losowej pozycji (task_rng(seed, n, it)) - okna
+#                 pokrywają cały ślad, a różne n nie zaczynają się wszystkie od zera
+#   sampled     - n losowych zadań (task_rng(seed, n, it)), posortowanych dla lokalności
+class TraceSource:
+    MODES = ('consecutive', 'sampled')
+
+    def __init__(self, path, dtype='float64', column=None, mode='consecutive'):
+        if path.endswith('.npy'): data = np.load(path, mmap_mode='r')
+        else: data = np.memmap(path, dtype=dtype, mode='r')
+        if data.ndim == 2: data = data[:, column or 0]
+        if len(data) == 0: raise ValueError(f"Pusty ślad: {path}")
+        self.data = data
+        self.mode = mode
+
+    def __len__(self):
+        return len(self.data)
+
+    def mean(self, chunk=1 << 22):
+        # średnia porcjami - bez wczytywania całego śladu naraz
+        total = 0.0
+        for start in range(0, len(self.data), chunk):
+            total += float(np.sum(self.data[start:start + chunk], dtype=np.float64))
+        return total / len(self.data)
+
+    def window(self, n, iteration, rng):
+        size = len(self.data)
+        if self.mode == 'sampled':
+            idx = np.sort(rng.integers(0, size, n))
+            return np.asarray(self.data[idx], dtype=float)
+        start = int(rng.integers(0, size))
+        if start + n <= size: return np.array(self.data[start:start + n], dtype=float)
+        return np.asarray(self.data[np.arange(start, start + n) % size], dtype=float)
+
+# otwarte ślady w bieżącym procesie - zadania puli nie otwierają pliku za każdym razem
+_trace_cache = {}
+
+def open_trace(spec):
+    key = (spec['path'], spec['dtype'], spec['column'], spec['mode'])
+    source = _trace_cache.get(key)
+    if source is None:
+        source = _trace_cache[key] = TraceSource(spec['path'], spec['dtype'], spec['column'], spec['mode'])
+    return source
+
+def trace_spec(path, dtype='float64', column=None, mode='consecutive'):
+    # opis śladu przekazywany do procesów roboczych; średnia liczona raz, a rozmiar
+    # i czas modyfikacji pliku trafiają do klucza cache wyników
+    path = os.path.abspath(path)
+    spec = {'path': path, 'dtype': dtype, 'column': column, 'mode': mode,
+            'size': os.path.getsize(path), 'mtime': os.path.getmtime(path)}
+    spec['mean'] = open_trace(spec).mean()
+    return spec
+
+def convert_csv_trace(csv_path, out_path, column=None, chunk_rows=1 << 20):
+    # CSV -> .npy (float64) strumieniowo: wiersze bez poprawnej, nieujemnej
+    # wartości są pomijane. Najpierw surowy plik binarny, potem nagłówek .npy.
+    tmp = out_path + '.tmp'
+    count = 0
+    with open(csv_path, newline='') as f, open(tmp, 'wb') as out:
+        reader = csv.reader(f)
+        header = next(reader)
+        col = header.index(column) if column else 0
+        buf = []
+        for row in reader:
+            try: value = float(row[col])
+            except (ValueError, IndexError): continue
+            if not value >= 0: continue
+            buf.append(value)
+            if len(buf) == chunk_rows:
+                out.write(np.asarray(buf).tobytes()); count += len(buf); buf = []
+        out.write(np.asarray(buf, dtype=np.float64).tobytes()); count += len(buf)
+    raw = np.memmap(tmp, dtype=np.float64, mode='r', shape=(count,)) if count else np.zeros(0)
+    dest = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float64, shape=(count,))
+    for start in range(0, count, chunk_rows): dest[start:start + chunk_rows] = raw[start:start + chunk_rows]
+    dest.flush()
+    del dest, raw
+    os.remove(tmp)
+    return count
@@ -0,0 +1,265 @@
+import argparse
+import heapq
+import math
+import os
+import time
+
+import numpy as np
+
+# --- ALOKATOR ONLINE ---
+# Bez limitów u_i oba rozwiązania zależą od całego systemu tylko przez sumy:
+#   NBS:           x_i = m_i + w_i * S / W      (S = C - sum(m), W = sum(w))
+#   Proportional:  x_i = m_i + m_i * S / M      (M = sum(m))
+# Metryki (jak w SimulationExperiment.record_result, liczone na nadwyżce):
+#   NBS:  Jain = W^2 / (n sum(w^2)),  makespan = r / (r + S/W) dla r = max(m/w),
+#         utility = sum(log w) + n log(S/W)
+#   Prop: Jain = M^2 / (n sum(m^2)),  makespan = M / C,
+#         utility = sum(log m) + n log(S/M)
+# Przyjście/odejście użytkownika aktualizuje sumy w O(1), a max(m/w) trzyma
+# kopiec z leniwym usuwaniem (O(log n)), więc nic nie jest rozwiązywane od nowa.
+class OnlineAllocator:
+    def __init__(self, capacity, resync_every=1 << 16):
+        self.capacity = capacity
+        self.active = {}  # uid -> (m, w)
+        self.heap = []    # (-m/w, uid); wpisy odeszłych użytkowników usuwane leniwie
+        self.sum_m = self.sum_m2 = self.sum_log_m = 0.0
+        self.sum_w = self.sum_w2 = self.sum_log_w = 0.0
+        # co tyle zmian sumy liczone są od nowa - dryf zaokrągleń przy milionach +/-
+        self.resync_every = resync_every
+        self.updates = 0
+
+    def __len__(self):
+        return len(self.active)
+
+    def add(self, uid, m, w=1.0):
+        self.active[uid] = (m, w)
+        heapq.heappush(self.heap, (-m / w, uid))
+        self.sum_m += m; self.sum_m2 += m * m; self.sum_log_m += math.log(m)
+        self.sum_w += w; self.sum_w2 += w * w; self.sum_log_w += math.log(w)
+        self._touch()
+
+    def remove(self, uid):
+        m, w = self.active.pop(uid)
+        self.sum_m -= m; self.sum_m2 -= m * m; self.sum_log_m -= math.log(m)
+        self.sum_w -= w; self.sum_w2 -= w * w; self.sum_log_w -= math.log(w)
+        # kopiec pełen martwych wpisów -> przebudowa (zamortyzowane O(1))
+        if len(self.heap) > 2 * len(self.active) + 64:
+            self.heap = [(-m / w, u) for u, (m, w) in self.active.items()]
+            heapq.heapify(self.heap)
+        self._touch()
+
+    def _touch(self):
+        self.updates += 1
+        if self.updates % self.resync_every == 0: self.resync()
+
+    def resync(self):
+        ms = np.array([v[0] for v in self.active.values()])
+        ws = np.array([v[1] for v in self.active.values()])
+        self.sum_m, self.sum_m2, self.sum_log_m = float(ms.sum()), float(ms @ ms), float(np.log(ms).sum())
+        self.sum_w, self.sum_w2, self.sum_log_w = float(ws.sum()), float(ws @ ws), float(np.log(ws).sum())
+
+    def surplus(self):
+        return self.capacity - self.sum_m
+
+    def max_ratio(self):
+        heap, active = self.heap, self.active
+        while heap[0][1] not in active: heapq.heappop(heap)
+        return -heap[0][0]
+
+    # Przydział pojedynczego użytkownika - O(1)
+    def nbs_allocation(self, uid):
+        m, w = self.active[uid]
+        return m + w * self.surplus() / self.sum_w
+
+    def proportional_allocation(self, uid):
+        m, _ = self.active[uid]
+        return m + m * self.surplus() / self.sum_m
+
+    # Pełne wektory przydziału - O(n), do weryfikacji z CloudAllocator
+    def allocations(self):
+        uids = list(self.active)
+        ms = np.array([self.active[u][0] for u in uids])
+        ws = np.array([self.active[u][1] for u in uids])
+        s = self.surplus()
+        return uids, ms + ws * s / ws.sum(), ms + ms * s / ms.sum()
+
+    def metrics(self):
+        # (nbs_fairness, nbs_makespan, nbs_utility, prop_fairness, prop_makespan, prop_utility)
+        n, s = len(self.active), self.surplus()
+        if n == 0 or s <= 0: return (math.nan,) * 6
+        share = s / self.sum_w
+        r = self.max_ratio()
+        nbs = (self.sum_w ** 2 / (n * self.sum_w2), r / (r + share),
+               self.sum_log_w + n * math.log(share))
+        prop = (self.sum_m ** 2 / (n * self.sum_m2), self.sum_m / self.capacity,
+                self.sum_log_m + n * math.log(s / self.sum_m))
+        return nbs + prop
+
+# --- ŹRÓDŁA PRZYJŚĆ ---
+# Generator krotek (czas przyjścia, czas trwania, min_req, waga) w kolejności czasu.
+def poisson_arrivals(rate, holding, req_min, req_max, rng, block=4096):
+    # losowanie porcjami - pojedyncze wywołania rng są wolniejsze niż sama obsługa zdarzenia
+    t = 0.0
+    while True:
+        arrivals = (t + np.cumsum(rng.exponential(1.0 / rate, block))).tolist()
+        durations = rng.exponential(holding, block).tolist()
+        reqs = rng.uniform(req_min, req_max, block).tolist()
+        for a, d, m in zip(arrivals, durations, reqs): yield a, d, m, 1.0
+        t = arrivals[-1]
+
+def load_trace(path):
+    # CSV z nagłówkiem: arrival,duration,min_req[,weight]
+    # atleast_1d: ślad z jednym wierszem genfromtxt zwraca jako tablicę 0-wymiarową
+    data = np.atleast_1d(np.genfromtxt(path, delimiter=',', names=True))
+    order = np.argsort(data['arrival'], kind='stable')
+    weights = data['weight'][order] if 'weight' in data.dtype.names else np.ones(len(order))
+    # OnlineAllocator liczy log(m) i log(w) - zero, wartość ujemna albo pusta komórka
+    # przerwałaby symulację w połowie, więc odrzucamy ślad od razu
+    for name, col in (('min_req', data['min_req'][order]), ('weight', weights)):
+        bad = np.flatnonzero(~(col > 0))
+        if len(bad): raise ValueError(f"{path}: kolumna {name} musi być > 0 ({len(bad)} wierszy, "
+                                      f"np. arrival={data['arrival'][order][bad[0]]:g})")
+    return data['arrival'][order], data['duration'][order], data['min_req'][order], weights
+
+def trace_arrivals(trace):
+    yield from zip(*(col.tolist() for col in trace))
+
+# --- SYMULACJA ZDARZENIOWA ---
+METRICS = ('nbs_fairness', 'nbs_makespan', 'nbs_utility',
+           'prop_fairness', 'prop_makespan', 'prop_utility')
+DEPARTURE, ARRIVAL = 0, 1  # przy równym czasie najpierw odejścia (zwalniają pojemność)
+
+class OnlineSimulation:
+    def __init__(self, allocator, arrivals, sample_dt=None):
+        # sample_dt=None -> próbka po każdym zdarzeniu; inaczej na siatce czasu co sample_dt
+        self.allocator = allocator
+        self.arrivals = arrivals
+        self.sample_dt = sample_dt
+        self.series = {name: [] for name in ('time', 'users', 'surplus') + METRICS}
+        self.events = 0
+
+    def _sample(self, t, values):
+        series = self.series
+        series['time'].append(t)
+        series['users'].append(len(self.allocator))
+        series['surplus'].append(self.allocator.surplus())
+        for name, v in zip(METRICS, values): series[name].append(v)
+
+    def run(self, horizon):
+        alloc = self.allocator
+        queue, seq = [], 0
+        first = next(self.arrivals, None)
+        if first is not None: heapq.heappush(queue, (first[0], ARRIVAL, seq, first))
+        next_sample = 0.0 if self.sample_dt else None
+        values = alloc.metrics()
+
+        while queue and queue[0][0] <= horizon:
+            t, kind, uid, payload = heapq.heappop(queue)
+            if next_sample is not None:
+                # stan jest stały między zdarzeniami - próbki siatki sprzed t biorą bieżące metryki
+                while next_sample < t:
+                    self._sample(next_sample, values)
+                    next_sample += self.sample_dt
+            if kind == ARRIVAL:
+                _, duration, m, w = payload
+                alloc.add(uid, m, w)
+                heapq.heappush(queue, (t + duration, DEPARTURE, uid, None))
+                nxt = next(self.arrivals, None)
+                if nxt is not None:
+                    seq += 1
+                    heapq.heappush(queue, (nxt[0], ARRIVAL, seq, nxt))
+            else:
+                alloc.remove(uid)
+            self.events += 1
+            values = alloc.metrics()
+            if next_sample is None: self._sample(t, values)
+
+        if next_sample is not None:
+            while next_sample <= horizon:
+                self._sample(next_sample, values)
+                next_sample += self.sample_dt
+        return {name: np.asarray(col) for name, col in self.series.items()}
+
+def time_averages(series, horizon):
+    # średnie ważone czasem trwania stanu (próbka obowiązuje do następnej)
+    t = series['time']
+    if len(t) == 0: return {}
+    dt = np.diff(np.append(t, horizon))
+    out = {}
+    for name in ('users',) + METRICS:
+        v = series[name]
+        ok = ~np.isnan(v) & (dt > 0)
+        out[name] = float(np.sum(v[ok] * dt[ok]) / np.sum(dt[ok])) if np.any(ok) else math.nan
+    # udział czasu bez wykonalnego przydziału (sum(m) > C)
+    out['overload_share'] = float(np.sum(dt[series['surplus'] < 0]) / max(np.sum(dt), 1e-12))
+    return out
+
+def plot_series(series, filename):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(4, 1, figsize=(14, 12), sharex=True)
+    t = series['time']
+    axes[0].step(t, series['users'], where='post', color='gray')
+    axes[0].set_ylabel('Aktywni użytkownicy')
+    panels = [('fairness', "Sprawiedliwość (Jain's Index)"), ('makespan', 'Makespan'),
+              ('utility', 'Suma Logarytmów Nadwyżki')]
+    for ax, (name, label) in zip(axes[1:], panels):
+        ax.step(t, series['nbs_' + name], where='post', label='Wei et al. (NBS)')
+        ax.step(t, series['prop_' + name], where='post', label='Proportional')
+        ax.set_ylabel(label)
+        ax.legend(loc='upper right')
+    axes[-1].set_xlabel('Czas')
+    plt.tight_layout()
+    print(f"Zapisywanie: {filename}")
+    plt.savefig(filename, dpi=150)
+    plt.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rate', type=float, default=100.0)      # przyjścia na jednostkę czasu
+    parser.add_argument('--holding', type=float, default=1.0)     # średni czas obsługi
+    parser.add_argument('--horizon', type=float, default=100.0)
+    parser.add_argument('--multiplier', type=float, default=1.5)
+    parser.add_argument('--min_req', type=float, default=1.0)
+    parser.add_argument('--max_req', type=float, default=100.0)
+    parser.add_argument('--capacity', type=float, default=None)
+    parser.add_argument('--trace', default=None)
+    parser.add_argument('--sample-dt', type=float, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--no-plot', action='store_true')
+    args = parser.parse_args()
+
+    if not args.trace and args.min_req <= 0: parser.error("--min_req musi być > 0")
+    if args.trace:
+        try: trace = load_trace(args.trace)
+        except ValueError as e: parser.error(str(e))
+        arrivals, durations, reqs, _ = trace
+        # średnie obciążenie z prawa Little'a: sum(czas * m) / długość śladu
+        span = max(float(arrivals[-1] - arrivals[0]), 1e-12)
+        capacity = args.capacity or args.multiplier * float(np.sum(durations * reqs)) / span
+        source = trace_arrivals(trace)
+        tag = 'online_' + os.path.splitext(os.path.basename(args.trace))[0]
+    else:
+        # pojemność jak w SimulationExperiment: multiplier * (średnia liczba użytkowników) * avg
+        avg = (args.min_req + args.max_req) / 2
+        capacity = args.capacity or args.multiplier * args.rate * args.holding * avg
+        rng = np.random.default_rng(args.seed)
+        source = poisson_arrivals(args.rate, args.holding, args.min_req, args.max_req, rng)
+        tag = f"online_M{args.multiplier}_R{int(args.min_req)}-{int(args.max_req)}_L{args.rate:g}"
+
+    print(f"Start: C={capacity:.1f}, horyzont={args.horizon}")
+    sim = OnlineSimulation(OnlineAllocator(capacity), source, args.sample_dt)
+    start = time.perf_counter()
+    series = sim.run(args.horizon)
+    wall = time.perf_counter() - start
+    print(f"Zdarzenia: {sim.events} w {wall:.2f} s ({sim.events / max(wall, 1e-12):,.0f} zdarzeń/s)")
+    for name, value in time_averages(series, args.horizon).items():
+        print(f"  {name:<16} {value:.4f}")
+
+    os.makedirs('results', exist_ok=True)
+    path = os.path.join('results', tag + '.npz')
+    np.savez_compressed(path, **series)
+    print(f"Szereg czasowy: {path}")
+    if not args.no_plot: plot_series(series, os.path.join('results', tag + '.png'))
@@ -0,0 +1,80 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# --- TELEMETRIA ---
+# Liczniki gorącej ścieżki: czasy faz, wywołania/porażki/histogram opóźnień
+# każdego backendu solvera oraz pominięte punkty (żaden solver nie dał wyniku).
+# Zapis to kilka operacji na słownikach - narzut pomijalny wobec solvera.
+# Stan jest zwykłym słownikiem, więc procesy robocze odsyłają go do scalenia.
+class Telemetry:
+    # granice kubełków histogramu opóźnień [s]; ostatni kubełek: > 10 s
+    LATENCY_EDGES = [1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0, 10.0]
+
+    def __init__(self):
+        self.phases = {}    # faza -> [liczba, łączny czas]
+        self.backends = {}  # backend -> {'calls', 'failures', 'seconds', 'histogram', 'errors'}
+        self.skipped = {}   # metoda -> liczba punktów bez rozwiązania
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try: yield
+        finally: self.add_phase(name, time.perf_counter() - start)
+
+    def add_phase(self, name, seconds, count=1):
+        entry = self.phases.setdefault(name, [0, 0.0])
+        entry[0] += count
+        entry[1] += seconds
+
+    def record_call(self, backend, seconds, ok, error=None):
+        entry = self.backends.get(backend)
+        if entry is None:
+            entry = self.backends[backend] = {'calls': 0, 'failures': 0, 'seconds': 0.0, 'errors': {},
+                                              'histogram': [0] * (len(self.LATENCY_EDGES) + 1)}
+        entry['calls'] += 1
+        entry['seconds'] += seconds
+        entry['histogram'][int(np.searchsorted(self.LATENCY_EDGES, seconds))] += 1
+        if not ok:
+            entry['failures'] += 1
+            if error: entry['errors'][error] = entry['errors'].get(error, 0) + 1
+
+    def skip(self, method, count=1):
+        self.skipped[method] = self.skipped.get(method, 0) + count
+
+    def to_dict(self):
+        return {'phases': {k: {'count': c, 'seconds': t} for k, (c, t) in self.phases.items()},
+                'backends': self.backends, 'skipped': self.skipped,
+                'latency_edges': self.LATENCY_EDGES}
+
+    def merge(self, data):
+        for name, p in data['phases'].items(): self.add_phase(name, p['seconds'], p['count'])
+        for name, b in data['backends'].items():
+            entry = self.backends.setdefault(name, {'calls': 0, 'failures': 0, 'seconds': 0.0, 'errors': {},
+                                                    'histogram': [0] * (len(self.LATENCY_EDGES) + 1)})
+            for key in ('calls', 'failures', 'seconds'): entry[key] += b[key]
+            entry['histogram'] = [a + c for a, c in zip(entry['histogram'], b['histogram'])]
+            for err, c in b['errors'].items(): entry['errors'][err] = entry['errors'].get(err, 0) + c
+        for method, c in data['skipped'].items(): self.skip(method, c)
+
+    def save(self, path):
+        if os.path.dirname(path): os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def summary(self):
+        lines = ["Telemetria - fazy:"]
+        for name, (count, total) in sorted(self.phases.items(), key=lambda kv: -kv[1][1]):
+            lines.append(f"  {name:<20} {total:9.3f} s  ({count} x, śr. {total / max(count, 1) * 1e3:.3f} ms)")
+        lines.append("Telemetria - backendy:")
+        labels = ['<10us', '<100us', '<1ms', '<10ms', '<100ms', '<1s', '<10s', '>10s']
+        for name, b in self.backends.items():
+            hist = ' '.join(f"{l}:{c}" for l, c in zip(labels, b['histogram']) if c)
+            lines.append(f"  {name:<20} wywołań {b['calls']}, porażek {b['failures']}, "
+                         f"{b['seconds']:.3f} s  [{hist}]")
+            for err, c in b['errors'].items(): lines.append(f"    {c} x {err}")
+        lines.append(f"Pominięte punkty: {self.skipped if self.skipped else 0}")
+        return '\n'.join(lines)
@@ -0,0 +1,266 @@
+import bisect
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+# --- MAGAZYN WYNIKÓW ---
+# Kolumnowy bufor wyników: typowane kolumny NumPy zamiast listy słowników.
+# Pełne porcje (chunk_size wierszy) są zrzucane na dysk jako chunk_XXXXX.npz,
+# więc przerwany przebieg zostawia wszystko poza ostatnią, niepełną porcją.
+# Bez `path` porcje zostają w pamięci (np. w procesach roboczych puli).
+class ResultsStore:
+    METHODS = ('Wei et al. (NBS)', 'Proportional')
+    COLUMNS = {'N_Users': np.int32, 'Iteration': np.int32, 'Method': np.int8, 'Fairness': np.float64,
+               'Makespan': np.float64, 'Total_Utility': np.float64}
+
+    def __init__(self, path=None, chunk_size=1 << 16, resume=False, overwrite=False):
+        # resume: dopisywanie do porcji w `path`; overwrite: usunięcie ich. Domyślnie
+        # katalog z porcjami (np. po przerwanym przebiegu) nie jest ruszany - błąd
+        self.path = path
+        self.chunk_size = chunk_size
+        self.buffer = {c: np.empty(chunk_size, dtype=t) for c, t in self.COLUMNS.items()}
+        self.fill = 0
+        self.flushed = 0
+        self.memory_chunks = []
+        self.chunk_files = []
+        if path:
+            os.makedirs(path, exist_ok=True)
+            old = sorted(f for f in os.listdir(path) if f.startswith('chunk_') and f.endswith('.npz'))
+            if old and not (resume or overwrite):
+                raise FileExistsError(f"{path}: porcje poprzedniego przebiegu - przelicz je (--from-raw) "
+                                      f"albo nadpisz (--overwrite-raw)")
+            for f in old:
+                full = os.path.join(path, f)
+                if resume:
+                    self.chunk_files.append(full)
+                    with np.load(full) as z: self.flushed += len(z['N_Users'])
+                else:
+                    os.remove(full)
+
+    def __len__(self):
+        return self.flushed + self.fill
+
+    def append(self, n, iteration, method, fairness, makespan, utility):
+        if self.fill == self.chunk_size: self.flush()
+        b, i = self.buffer, self.fill
+        b['N_Users'][i] = n
+        b['Iteration'][i] = iteration
+        b['Method'][i] = self.METHODS.index(method)
+        b['Fairness'][i] = fairness
+        b['Makespan'][i] = makespan
+        b['Total_Utility'][i] = utility
+        self.fill += 1
+
+    def extend(self, n, iterations, method, fairness, makespan, utility):
+        count = len(fairness)
+        self.extend_columns({'N_Users': np.full(count, n), 'Iteration': iterations, 'Method': np.full(count, self.METHODS.index(method)),
+                             'Fairness': fairness, 'Makespan': makespan, 'Total_Utility': utility})
+
+    def extend_columns(self, columns):
+        count = len(columns['N_Users'])
+        done = 0
+        while done < count:
+            if self.fill == self.chunk_size: self.flush()
+            take = min(count - done, self.chunk_size - self.fill)
+            for c in self.COLUMNS:
+                self.buffer[c][self.fill:self.fill + take] = columns[c][done:done + take]
+            self.fill += take
+            done += take
+
+    def flush(self):
+        if self.fill == 0: return
+        chunk = {c: self.buffer[c][:self.fill].copy() for c in self.COLUMNS}
+        if self.path:
+            name = os.path.join(self.path, f"chunk_{len(self.chunk_files):05d}.npz")
+            # zapis przez plik tymczasowy - przerwanie nie zostawi uszkodzonej porcji
+            tmp = name + '.tmp'
+            with open(tmp, 'wb') as f: np.savez(f, **chunk)
+            os.replace(tmp, name)
+            self.chunk_files.append(name)
+        else:
+            self.memory_chunks.append(chunk)
+        self.flushed += self.fill
+        self.fill = 0
+
+    def iter_chunks(self):
+        # czytanie leniwe - w pamięci jest naraz tylko jedna porcja
+        for name in self.chunk_files:
+            with np.load(name) as z: yield {c: z[c] for c in self.COLUMNS}
+        yield from self.memory_chunks
+        if self.fill: yield {c: self.buffer[c][:self.fill] for c in self.COLUMNS}
+
+    def columns(self):
+        chunks = list(self.iter_chunks())
+        if not chunks: return {c: np.empty(0, dtype=t) for c, t in self.COLUMNS.items()}
+        return {c: np.concatenate([ch[c] for ch in chunks]) for c in self.COLUMNS}
+
+# --- AGREGACJA STRUMIENIOWA ---
+# Zamiast surowych wierszy: dla każdego (N_Users, metoda) liczba próbek,
+# średnia, M2 (Welford; porcje łączone wzorem Chana), min i max każdej metryki.
+# Pamięć rośnie z liczbą punktów siatki, nie z liczbą iteracji, a wykres
+# z analitycznym przedziałem ufności (t-Studenta) rysuje się natychmiast.
+class P2Quantile:
+    # Szkic kwantyla P^2 (Jain, Chlamtac 1985): 5 markerów, O(1) pamięci
+    def __init__(self, p):
+        self.p = p
+        self.q = []
+        self.pos = [0.0, 1.0, 2.0, 3.0, 4.0]
+        self.desired = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+        self.step = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def update(self, x):
+        q, pos = self.q, self.pos
+        if len(q) < 5:
+            bisect.insort(q, x)
+            return
+        if x < q[0]: q[0] = x; k = 0
+        elif x >= q[4]: q[4] = x; k = 3
+        else: k = bisect.bisect_right(q, x) - 1
+        for i in range(k + 1, 5): pos[i] += 1
+        for i in range(5): self.desired[i] += self.step[i]
+        for i in (1, 2, 3):
+            d = self.desired[i] - pos[i]
+            if (d >= 1 and pos[i + 1] - pos[i] > 1) or (d <= -1 and pos[i - 1] - pos[i] < -1):
+                d = 1 if d > 0 else -1
+                # interpolacja paraboliczna, a gdy wychodzi poza sąsiadów - liniowa
+                qp = q[i] + d / (pos[i + 1] - pos[i - 1]) * (
+                    (pos[i] - pos[i - 1] + d) * (q[i + 1] - q[i]) / (pos[i + 1] - pos[i]) +
+                    (pos[i + 1] - pos[i] - d) * (q[i] - q[i - 1]) / (pos[i] - pos[i - 1]))
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + d * (q[i + d] - q[i]) / (pos[i + d] - pos[i])
+                q[i] = qp
+                pos[i] += d
+
+    def value(self):
+        if len(self.q) < 5: return float(np.quantile(self.q, self.p)) if self.q else np.nan
+        return self.q[2]
+
+class StreamingStats:
+    METRICS = ('Fairness', 'Makespan', 'Total_Utility')
+    FIELDS = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self, quantiles=()):
+        self.quantiles = tuple(quantiles)
+        self.groups = {}    # (n, kod metody) -> tablica (FIELDS x METRICS)
+        self.sketches = {}  # (n, kod metody) -> [[P2Quantile na kwantyl] na metrykę]
+
+    def __len__(self):
+        return len(self.groups)
+
+    def update(self, columns):
+        if len(columns['N_Users']) == 0: return
+        keys = columns['N_Users'].astype(np.int64) * 256 + columns['Method']
+        uniq, inv = np.unique(keys, return_inverse=True)
+        values = np.stack([np.asarray(columns[m], dtype=float) for m in self.METRICS], axis=1)
+        g, k = len(uniq), len(self.METRICS)
+        count = np.bincount(inv, minlength=g).astype(float)
+        mean = np.stack([np.bincount(inv, values[:, j], g) for j in range(k)], axis=1) / count[:, None]
+        dev = values - mean[inv]
+        m2 = np.stack([np.bincount(inv, dev[:, j] ** 2, g) for j in range(k)], axis=1)
+        lo = np.full((g, k), np.inf); np.minimum.at(lo, inv, values)
+        hi = np.full((g, k), -np.inf); np.maximum.at(hi, inv, values)
+        for row, key in enumerate(uniq.tolist()):
+            self._merge((key >> 8, key & 255), count[row], mean[row], m2[row], lo[row], hi[row])
+        if self.quantiles:
+            for key, vals in zip(uniq.tolist(), np.split(values[np.argsort(inv, kind='stable')],
+                                                         np.cumsum(count[:-1]).astype(int))):
+                sketch = self.sketches.setdefault((key >> 8, key & 255),
+                                                  [[P2Quantile(q) for q in self.quantiles] for _ in self.METRICS])
+                for j, per_metric in enumerate(sketch):
+                    for x in vals[:, j].tolist():
+                        for sk in per_metric: sk.update(x)
+
+    def _merge(self, key, count, mean, m2, lo, hi):
+        old = self.groups.get(key)
+        if old is None:
+            self.groups[key] = np.stack([np.full_like(mean, count), mean, m2, lo, hi])
+            return
+        n_a = old[0]
+        total = n_a + count
+        delta = mean - old[1]
+        old[1] += delta * count / total
+        old[2] += m2 + delta ** 2 * n_a * count / total
+        old[0] = total
+        np.minimum(old[3], lo, out=old[3])
+        np.maximum(old[4], hi, out=old[4])
+
+    def point(self, n, method, confidence=0.95):
+        # słownik metryka -> (średnia, połowa szerokości przedziału ufności, liczba próbek)
+        from scipy.special import stdtrit  # kwantyl t-Studenta bez ciężkiego scipy.stats
+        stats = self.groups[(n, ResultsStore.METHODS.index(method))]
+        count, mean = stats[0], stats[1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std = np.sqrt(stats[2] / (count - 1))
+            half = stdtrit(count - 1, 0.5 + confidence / 2) * std / np.sqrt(count)
+        half = np.where(count > 1, half, np.nan)
+        return {m: (mean[j], half[j], int(count[j])) for j, m in enumerate(self.METRICS)}
+
+    def series(self, method, metric, confidence=0.95):
+        # (N_Users, średnia, połowa szerokości CI) posortowane po n
+        code, j = ResultsStore.METHODS.index(method), self.METRICS.index(metric)
+        ns = sorted(n for n, c in self.groups if c == code)
+        points = [self.point(n, method, confidence)[metric] for n in ns]
+        return np.array(ns), np.array([p[0] for p in points]), np.array([p[1] for p in points])
+
+    def save_csv(self, path, confidence=0.95):
+        header = ['N_Users', 'Method', 'Metric', 'count', 'mean', 'std', 'min', 'max', 'ci_half']
+        header += [f"q{q:g}" for q in self.quantiles]
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for (n, code), stats in sorted(self.groups.items()):
+                method = ResultsStore.METHODS[code]
+                point = self.point(n, method, confidence)
+                for j, metric in enumerate(self.METRICS):
+                    count = stats[0, j]
+                    std = np.sqrt(stats[2, j] / (count - 1)) if count > 1 else np.nan
+                    row = [n, method, metric, int(count), stats[1, j], std, stats[3, j], stats[4, j], point[metric][1]]
+                    if (n, code) in self.sketches: row += [sk.value() for sk in self.sketches[(n, code)][j]]
+                    writer.writerow(row)
+
+# --- CACHE WYNIKÓW ---
+# Trwały cache punktów (scenariusz, n, iteracja, metoda) w SQLite, adresowany
+# skrótem parametrów, metody, backendu solvera i seeda. Ponowne i rozszerzone
+# przebiegi liczą tylko brakujące punkty; zapis po każdym bloku działa jak
+# checkpoint, więc przerwany przebieg wznawia się od miejsca przerwania.
+class ResultCache:
+    VERSION = 2  # zmiana wzorów metryk/generatora -> podbić, stare wpisy tracą ważność
+
+    def __init__(self, path):
+        if os.path.dirname(path): os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS points ("
+                          "key TEXT PRIMARY KEY, fairness REAL, makespan REAL, utility REAL)")
+
+    @classmethod
+    def key(cls, params, method, n, iteration):
+        # Proportional nie zależy od solvera NBS - współdzieli punkty między backendami
+        backend = params['solver'] if method == 'Wei et al. (NBS)' else 'closed-form'
+        fields = [cls.VERSION, params['multiplier'], params['req_min'], params['req_max'],
+                  method, backend, str(params['seed']), n, iteration]
+        # ślad tylko gdy jest - klucze przebiegów syntetycznych bez zmian
+        if params.get('trace'): fields.append(params['trace'])
+        raw = json.dumps(fields)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get_many(self, keys):
+        # klucz -> (fairness, makespan, utility); None w metrykach = brak rozwiązania
+        found = {}
+        for start in range(0, len(keys), 500):
+            part = keys[start:start + 500]
+            marks = ','.join('?' * len(part))
+            for key, f, m, u in self.conn.execute(
+                    f"SELECT key, fairness, makespan, utility FROM points WHERE key IN ({marks})", part):
+                found[key] = (f, m, u)
+        return found
+
+    def put_many(self, items):
+        self.conn.executemany("INSERT OR REPLACE INTO points VALUES (?, ?, ?, ?)", items)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()